@@ -9,5 +9,7 @@ class Settings:
     UPSTOX_REDIRECT_URI = os.getenv("UPSTOX_REDIRECT_URI")
     MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
     PORT = int(os.getenv("PORT", 8000))
+    DEBUG = os.getenv("DEBUG", "false").lower() in ("1", "true", "yes")
+    PIN_SDK_THREAD = os.getenv("PIN_SDK_THREAD", "false").lower() in ("1", "true", "yes")
 
 settings = Settings()
@@ -38,8 +38,15 @@ async def main():
         print("👋 Goodbye!")
 
 if __name__ == "__main__":
+    # uvloop is an optional drop-in replacement for the default selector loop
     try:
-        asyncio.run(main())
+        import uvloop
+        run = uvloop.run
+    except ImportError:
+        run = asyncio.run
+
+    try:
+        run(main())
     except KeyboardInterrupt:
         pass
 
@@ -0,0 +1,151 @@
+"""
+Numba kernels for the indicators TrendAnalyzer recomputes on every analysis pass.
+
+Each kernel follows the pandas_ta definition (0.3.14b, non TA-Lib path) on
+float64 arrays, including pandas' own ewm recursion, so results match the
+library to rounding. Warm-up values are NaN, as in pandas_ta.
+"""
+import sys
+import numpy as np
+from app.utils._njit import njit
+
+_EPS = sys.float_info.epsilon
+
+@njit(cache=True)
+def _ewm_mean(vals, com, adjust, minp):
+    """Series.ewm(com=com, adjust=adjust, min_periods=minp).mean() with ignore_na=False"""
+    n = len(vals)
+    out = np.empty(n)
+    if n == 0:
+        return out
+    minp = max(minp, 1)
+    alpha = 1.0 / (1.0 + com)
+    old_wt_factor = 1.0 - alpha
+    new_wt = 1.0 if adjust else alpha
+
+    weighted = vals[0]
+    nobs = 1 if weighted == weighted else 0
+    out[0] = weighted if nobs >= minp else np.nan
+    old_wt = 1.0
+    for i in range(1, n):
+        cur = vals[i]
+        is_obs = cur == cur
+        if is_obs:
+            nobs += 1
+        if weighted == weighted:
+            old_wt *= old_wt_factor
+            if is_obs:
+                # Same constant-series guard as pandas
+                if weighted != cur:
+                    weighted = old_wt * weighted + new_wt * cur
+                    weighted /= (old_wt + new_wt)
+                if adjust:
+                    old_wt += new_wt
+                else:
+                    old_wt = 1.0
+        elif is_obs:
+            weighted = cur
+        out[i] = weighted if nobs >= minp else np.nan
+    return out
+
+@njit(cache=True)
+def _rma(vals, length):
+    """Wilder's moving average: ewm(alpha=1/length, min_periods=length, adjust=True)"""
+    return _ewm_mean(vals, 1.0 / (1.0 / length) - 1.0, True, length)
+
+@njit(cache=True)
+def _ema_loop(prices, length):
+    """EMA seeded with the SMA of the first `length` values, then ewm(span=length, adjust=False)"""
+    n = len(prices)
+    if n < length:
+        return np.full(n, np.nan)
+    x = prices.copy()
+    total = 0.0
+    for i in range(length):
+        total += x[i]
+    x[:length - 1] = np.nan
+    x[length - 1] = total / length
+    return _ewm_mean(x, (length - 1) / 2.0, False, 0)
+
+@njit(cache=True)
+def _true_range(high, low, close):
+    n = len(close)
+    hl = high - low
+    # pandas_ta non_zero_range: nudge the whole series when any bar has zero range
+    for i in range(n):
+        if hl[i] == 0:
+            hl = hl + _EPS
+            break
+    tr = np.empty(n)
+    if n == 0:
+        return tr
+    tr[0] = np.nan
+    for i in range(1, n):
+        prev_close = close[i - 1]
+        tr[i] = max(abs(hl[i]), abs(high[i] - prev_close), abs(prev_close - low[i]))
+    return tr
+
+@njit(cache=True)
+def _atr_loop(high, low, close, length):
+    return _rma(_true_range(high, low, close), length)
+
+@njit(cache=True, error_model='numpy')
+def _rsi_loop(close, length):
+    n = len(close)
+    pos = np.empty(n)
+    neg = np.empty(n)
+    if n == 0:
+        return pos
+    pos[0] = np.nan
+    neg[0] = np.nan
+    for i in range(1, n):
+        d = close[i] - close[i - 1]
+        pos[i] = d if d > 0 else 0.0
+        neg[i] = d if d < 0 else 0.0
+    pos_avg = _rma(pos, length)
+    neg_avg = _rma(neg, length)
+    return 100.0 * pos_avg / (pos_avg + np.abs(neg_avg))
+
+@njit(cache=True, error_model='numpy')
+def _adx_loop(high, low, close, length):
+    n = len(close)
+    atr_ = _atr_loop(high, low, close, length)
+
+    pos = np.empty(n)
+    neg = np.empty(n)
+    if n == 0:
+        return pos
+    pos[0] = np.nan
+    neg[0] = np.nan
+    for i in range(1, n):
+        up = high[i] - high[i - 1]
+        dn = low[i - 1] - low[i]
+        p = up if (up > dn and up > 0) else 0.0
+        m = dn if (dn > up and dn > 0) else 0.0
+        pos[i] = 0.0 if abs(p) < _EPS else p
+        neg[i] = 0.0 if abs(m) < _EPS else m
+
+    k = 100.0 / atr_
+    dmp = k * _rma(pos, length)
+    dmn = k * _rma(neg, length)
+    dx = 100.0 * np.abs(dmp - dmn) / (dmp + dmn)
+    return _rma(dx, length)
+
+def _f64(x) -> np.ndarray:
+    return np.ascontiguousarray(x, dtype=np.float64)
+
+def ema(close, length: int) -> np.ndarray:
+    """pandas_ta ema(close, length)"""
+    return _ema_loop(_f64(close), length)
+
+def rsi(close, length: int = 14) -> np.ndarray:
+    """pandas_ta rsi(close, length)"""
+    return _rsi_loop(_f64(close), length)
+
+def atr(high, low, close, length: int = 14) -> np.ndarray:
+    """pandas_ta atr(high, low, close, length) (RMA of true range)"""
+    return _atr_loop(_f64(high), _f64(low), _f64(close), length)
+
+def adx(high, low, close, length: int = 14) -> np.ndarray:
+    """pandas_ta adx(...)['ADX_<length>']"""
+    return _adx_loop(_f64(high), _f64(low), _f64(close), length)
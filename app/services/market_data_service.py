@@ -11,6 +11,15 @@ class MarketDataService:
             "Accept": "application/json",
             "Authorization": f"Bearer {access_token}"
         }
+        # One pooled client for the service lifetime (no TLS handshake per call); see close()
+        self._client = httpx.AsyncClient(
+            timeout=5.0,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+        )
+
+    async def close(self):
+        """Release the pooled HTTP connections"""
+        await self._client.aclose()
 
     async def fetch_option_chain(self, instrument_key: str, expiry_date: str) -> Dict:
         """
@@ -24,17 +33,16 @@ class MarketDataService:
             "expiry_date": expiry_date
         }
         
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(url, params=params, headers=self.headers)
-                if response.status_code == 200:
-                    return response.json()
-                else:
-                    print(f"❌ Error fetching option chain: {response.status_code} - {response.text}")
-                    return {}
-            except Exception as e:
-                print(f"❌ Exception fetching option chain: {e}")
+        try:
+            response = await self._client.get(url, params=params, headers=self.headers)
+            if response.status_code == 200:
+                return response.json()
+            else:
+                print(f"❌ Error fetching option chain: {response.status_code} - {response.text}")
                 return {}
+        except Exception as e:
+            print(f"❌ Exception fetching option chain: {e}")
+            return {}
 
     def extract_target_strikes(self, option_chain: Dict, spot_price: float, step: int = 100) -> Tuple[List[str], Dict]:
         """
@@ -132,39 +140,38 @@ class MarketDataService:
         url = f"{self.base_url}/market-quote/ltp"
         params = {"instrument_key": instrument_key}
         
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(url, params=params, headers=self.headers)
-                if response.status_code == 200:
-                    data = response.json()
-                    # Response format: "data": { "NSE_INDEX|Nifty Bank": { "last_price": 12345.65, ... } }
+        try:
+            response = await self._client.get(url, params=params, headers=self.headers)
+            if response.status_code == 200:
+                data = response.json()
+                # Response format: "data": { "NSE_INDEX|Nifty Bank": { "last_price": 12345.65, ... } }
+                
+                if 'data' in data:
+                    feed_data = data['data']
                     
-                    if 'data' in data:
-                        feed_data = data['data']
-                        
-                        # 1. Direct lookup
-                        if instrument_key in feed_data:
-                            return feed_data[instrument_key]['last_price']
+                    # 1. Direct lookup
+                    if instrument_key in feed_data:
+                        return feed_data[instrument_key]['last_price']
+                    
+                    # 2. Try fuzzy matching (separators | vs : and spaces)
+                    for key, details in feed_data.items():
+                        # Normalize: treat | and : as same, spaces as %20
+                        k_norm = key.replace('|', ':').replace(' ', '%20')
+                        i_norm = instrument_key.replace('|', ':').replace(' ', '%20')
                         
-                        # 2. Try fuzzy matching (separators | vs : and spaces)
-                        for key, details in feed_data.items():
-                            # Normalize: treat | and : as same, spaces as %20
-                            k_norm = key.replace('|', ':').replace(' ', '%20')
-                            i_norm = instrument_key.replace('|', ':').replace(' ', '%20')
+                        if k_norm == i_norm:
+                            print(f"[WARN] Key mismatch handled: Requested '{instrument_key}', Found '{key}'")
+                            return details['last_price']
                             
-                            if k_norm == i_norm:
-                                print(f"[WARN] Key mismatch handled: Requested '{instrument_key}', Found '{key}'")
-                                return details['last_price']
-                                
-                        # 3. Debug if still not found
-                        print(f"[ERROR] Market Status: Key '{instrument_key}' not found in response keys: {list(feed_data.keys())}")
-                        print(f"[DEBUG] Full Response: {data}")
-                        
-                    else:
-                        print(f"[ERROR] Market Status: 'data' field missing in response: {data}")
+                    # 3. Debug if still not found
+                    print(f"[ERROR] Market Status: Key '{instrument_key}' not found in response keys: {list(feed_data.keys())}")
+                    print(f"[DEBUG] Full Response: {data}")
+                    
+                else:
+                    print(f"[ERROR] Market Status: 'data' field missing in response: {data}")
 
-            except Exception as e:
-                print(f"[ERROR] Exception fetching market status: {e}")
+        except Exception as e:
+            print(f"[ERROR] Exception fetching market status: {e}")
         return 0.0
 
     async def fetch_historical_data(self, instrument_key: str, interval: str = "1minute", days: int = 5) -> List[Dict]:
@@ -178,32 +185,31 @@ class MarketDataService:
         
         url = f"https://api.upstox.com/v2/historical-candle/{instrument_key}/{interval}/{to_date}/{from_date}"
         
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(url, headers={"Accept": "application/json"})
-                if response.status_code == 200:
-                    data = response.json()
-                    if "data" in data and "candles" in data["data"]:
-                        # Convert to standard format
-                        candles = []
-                        for c in data["data"]["candles"]:
-                            # Upstox Format: [timestamp, open, high, low, close, volume, oi]
-                            candles.append({
-                                'timestamp': datetime.fromisoformat(c[0]),
-                                'open': float(c[1]),
-                                'high': float(c[2]),
-                                'low': float(c[3]),
-                                'close': float(c[4]),
-                                'volume': float(c[5])
-                            })
-                        # Sort by timestamp ascending
-                        candles.sort(key=lambda x: x['timestamp'])
-                        print(f"[INFO] Fetched {len(candles)} historical candles for {instrument_key}")
-                        return candles
-                
-                print(f"[WARN] Failed to fetch history: {response.status_code} - {response.text}")
-                return []
-                
-            except Exception as e:
-                print(f"[ERROR] Exception fetching history: {e}")
-                return []
+        try:
+            response = await self._client.get(url, headers={"Accept": "application/json"})
+            if response.status_code == 200:
+                data = response.json()
+                if "data" in data and "candles" in data["data"]:
+                    # Convert to standard format
+                    candles = []
+                    for c in data["data"]["candles"]:
+                        # Upstox Format: [timestamp, open, high, low, close, volume, oi]
+                        candles.append({
+                            'timestamp': datetime.fromisoformat(c[0]),
+                            'open': float(c[1]),
+                            'high': float(c[2]),
+                            'low': float(c[3]),
+                            'close': float(c[4]),
+                            'volume': float(c[5])
+                        })
+                    # Sort by timestamp ascending
+                    candles.sort(key=lambda x: x['timestamp'])
+                    print(f"[INFO] Fetched {len(candles)} historical candles for {instrument_key}")
+                    return candles
+            
+            print(f"[WARN] Failed to fetch history: {response.status_code} - {response.text}")
+            return []
+            
+        except Exception as e:
+            print(f"[ERROR] Exception fetching history: {e}")
+            return []
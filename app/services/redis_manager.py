@@ -3,6 +3,16 @@ import json
 import os
 from typing import Callable, Awaitable
 
+# orjson encodes/decodes in C and returns bytes, which redis publishes as-is.
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so error handling is unchanged.
+try:
+    import orjson
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    _dumps = json.dumps
+    _loads = json.loads
+
 class RedisManager:
     def __init__(self):
         self.redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
@@ -24,7 +34,7 @@ class RedisManager:
         """Publish a message to a channel"""
         if not self.redis:
             await self.connect()
-        await self.redis.publish(channel, json.dumps(message))
+        await self.redis.publish(channel, _dumps(message))
 
     async def subscribe(self, channel: str, callback: Callable[[dict], Awaitable[None]]):
         """Subscribe to a channel and execute callback on message"""
@@ -38,7 +48,7 @@ class RedisManager:
         async for message in self.pubsub.listen():
             if message["type"] == "message":
                 try:
-                    data = json.loads(message["data"])
+                    data = _loads(message["data"])
                     await callback(data)
                 except json.JSONDecodeError:
                     print(f"[ERROR] Failed to decode message: {message['data']}")
@@ -1,5 +1,6 @@
 from datetime import datetime
 from typing import List, Dict, Optional, Generator
+import numpy as np
 import pandas as pd
 import asyncio
 
@@ -8,9 +9,12 @@ class MarketReplayService:
     Manages the playback of historical data.
     Acts as the 'Clock' and 'Data Source' for the replay.
     """
-    def __init__(self, data: List[Dict]):
+    def __init__(self, data: Optional[List[Dict]] = None):
         # data: List of 1-min candles [{'timestamp':..., 'open':..., ...}]
-        self.data = sorted(data, key=lambda x: x['timestamp'])
+        self.data = sorted(data or [], key=lambda x: x['timestamp'])
+        # Columnar source (see load_columnar); candles are then built on demand
+        self._ts: Optional[np.ndarray] = None
+        self._ohlcv: Optional[np.ndarray] = None
         self.current_index = 0
         self._current_time = None
         self.current_candle = None
@@ -19,8 +23,27 @@ class MarketReplayService:
     def current_time(self) -> datetime:
         return self._current_time
 
+    def load_columnar(self, ts, ohlcv: np.ndarray):
+        """
+        Load candles as arrays instead of a list of dicts.
+        ts: timestamps (datetime), ohlcv: (n, 5) array of open/high/low/close/volume.
+        """
+        ts = np.asarray(ts, dtype=object)
+        ohlcv = np.asarray(ohlcv, dtype=np.float64)
+        if len(ts) != len(ohlcv):
+            raise ValueError(f"ts/ohlcv length mismatch: {len(ts)} != {len(ohlcv)}")
+
+        order = np.argsort(ts, kind='stable')
+        self._ts = ts[order]
+        self._ohlcv = ohlcv[order]
+        self.data = []
+        self.reset()
+
+    def __len__(self) -> int:
+        return len(self._ts) if self._ts is not None else len(self.data)
+
     def has_next(self) -> bool:
-        return self.current_index < len(self.data)
+        return self.current_index < len(self)
 
     async def next_tick(self) -> Optional[Dict]:
         """
@@ -30,7 +53,18 @@ class MarketReplayService:
         if not self.has_next():
             return None
             
-        self.current_candle = self.data[self.current_index]
+        if self._ts is not None:
+            o, h, l, c, v = self._ohlcv[self.current_index].tolist()
+            self.current_candle = {
+                "timestamp": self._ts[self.current_index],
+                "open": o,
+                "high": h,
+                "low": l,
+                "close": c,
+                "volume": v
+            }
+        else:
+            self.current_candle = self.data[self.current_index]
         self._current_time = self.current_candle['timestamp']
         self.current_index += 1
         
@@ -1,10 +1,108 @@
 from datetime import datetime
 from typing import Dict, Tuple, Optional
+import numpy as np
 from app.models.trade import VirtualTrade, TradeStatus, TradeType
+from app.utils._njit import njit
+
+# --- Trade state kernel ---
+# State vector layout (float64[8]) used by _update_trade_state
+S_ENTRY, S_SL, S_TARGET, S_ATR, S_MFE, S_FLAGS = 0, 1, 2, 3, 4, 5
+STATE_SIZE = 8
+
+# Bits stored in state[S_FLAGS]
+F_PUT = 1
+F_BE_MOVED = 2
+F_PARTIAL_BOOKED = 4
+F_TRAILING = 8
+
+# Action bits returned by _update_trade_state
+A_EXIT = 1
+A_BREAK_EVEN = 2
+A_PARTIAL = 4
+A_TRAIL = 8
+
+@njit(cache=True)
+def _update_trade_state(state, price, high, low):
+    """
+    One tick of the trade state machine (SL hit, break-even, partial, trailing).
+    Mutates `state` in place and returns the A_* action bits.
+    """
+    flags = int(state[S_FLAGS])
+    is_put = (flags & F_PUT) != 0
+    sl = state[S_SL]
+
+    # 0. Check Hit SL
+    if is_put:
+        if price >= sl:
+            return A_EXIT
+    elif price <= sl:
+        return A_EXIT
+
+    # MFE (Points in favor)
+    entry = state[S_ENTRY]
+    atr = state[S_ATR]
+    mfe = entry - price if is_put else price - entry
+    if mfe > state[S_MFE]:
+        state[S_MFE] = mfe
+
+    actions = 0
+
+    # 1. Break-Even (At 1.0 ATR)
+    if (flags & F_BE_MOVED) == 0 and mfe >= 1.0 * atr:
+        sl = entry
+        flags |= F_BE_MOVED
+        actions |= A_BREAK_EVEN
+
+    # 2. Partial Exit (At 1.2 ATR)
+    if (flags & F_PARTIAL_BOOKED) == 0 and mfe >= 1.2 * atr:
+        flags |= F_PARTIAL_BOOKED
+        actions |= A_PARTIAL
+
+    # 3. Trailing Stop (Starts at 1.5 ATR): candle low (CALL) / high (PUT), never loosened
+    if mfe >= 1.5 * atr:
+        flags |= F_TRAILING
+
+    if (flags & F_TRAILING) != 0:
+        new_sl = sl
+        if is_put:
+            if high < sl:
+                new_sl = high
+        elif low > sl:
+            new_sl = low
+        if new_sl != sl:
+            sl = new_sl
+            actions |= A_TRAIL
+
+    state[S_SL] = sl
+    state[S_FLAGS] = flags
+    return actions
+
+def _flag_property(bit: int, doc: str) -> property:
+    def getter(self) -> bool:
+        return (int(self._state[S_FLAGS]) & bit) != 0
+
+    def setter(self, value: bool):
+        flags = int(self._state[S_FLAGS])
+        self._state[S_FLAGS] = (flags | bit) if value else (flags & ~bit)
+
+    return property(getter, setter, doc=doc)
+
+def _state_property(idx: int, doc: str) -> property:
+    def getter(self) -> float:
+        return float(self._state[idx])
+
+    def setter(self, value: float):
+        self._state[idx] = value
+
+    return property(getter, setter, doc=doc)
 
 class ActiveTradeContext:
     def __init__(self, trade: VirtualTrade, atr: float, sl: float, target: float, entry_order_id: str = None):
         self.trade = trade
+        # Numeric state lives in one float64 vector so update() can run as a compiled kernel
+        self._state = np.zeros(STATE_SIZE, dtype=np.float64)
+        if trade.tradeType != TradeType.CALL:
+            self._state[S_FLAGS] = F_PUT
         self.atr = atr
         self.current_sl = sl
         self.target = target
@@ -16,79 +114,40 @@ class ActiveTradeContext:
         
         # State
         self.highest_mfe = 0.0 # Max Favorable Excursion (Points)
-        self.is_partial_booked = False
-        self.be_moved = False
-        self.trailing_active = False
         
         # For trailing logic
         self.entry_price = trade.entryPrice
+
+    entry_price = _state_property(S_ENTRY, "Entry price used for MFE / break-even")
+    current_sl = _state_property(S_SL, "Current stop loss")
+    target = _state_property(S_TARGET, "Target price")
+    atr = _state_property(S_ATR, "ATR at entry")
+    highest_mfe = _state_property(S_MFE, "Max Favorable Excursion (Points)")
+    be_moved = _flag_property(F_BE_MOVED, "SL moved to break-even")
+    is_partial_booked = _flag_property(F_PARTIAL_BOOKED, "Partial profit booked")
+    trailing_active = _flag_property(F_TRAILING, "Trailing stop engaged")
         
     def update(self, current_price: float, high: float, low: float) -> Dict:
         """
         Update trade state per tick/candle.
         Returns Dict of actions e.g. {"action": "UPDATE_SL", "price": ...} or {"action": "EXIT", ...}
         """
+        act = _update_trade_state(self._state, float(current_price), float(high), float(low))
         
-        # 0. Check Hit SL
-        if self.trade.tradeType == TradeType.CALL:
-            if current_price <= self.current_sl:
-                return {"action": "EXIT_ALL", "reason": "STOP_LOSS", "price": self.current_sl}
-        else:
-            if current_price >= self.current_sl:
-                 return {"action": "EXIT_ALL", "reason": "STOP_LOSS", "price": self.current_sl}
-                 
-        # Calculate MFE (Points in favor)
-        if self.trade.tradeType == TradeType.CALL:
-            mfe = current_price - self.entry_price
-        else:
-            mfe = self.entry_price - current_price
-            
-        if mfe > self.highest_mfe:
-            self.highest_mfe = mfe
+        if act & A_EXIT:
+            return {"action": "EXIT_ALL", "reason": "STOP_LOSS", "price": self.current_sl}
             
         actions = {}
-        
-        # 1. Break-Even Logic (At 1.0 ATR)
-        # Move SL to Entry if not already moved
-        if not self.be_moved and mfe >= (1.0 * self.atr):
-            self.current_sl = self.entry_price
-            self.be_moved = True
+        if act & A_BREAK_EVEN:
             actions["update_sl"] = self.current_sl
             actions["log"] = "Moved SL to Break-Even (1 ATR Reached)"
             
-        # 2. Partial Exit (At 1.2 ATR)
-        if not self.is_partial_booked and mfe >= (1.2 * self.atr):
-            self.is_partial_booked = True
+        if act & A_PARTIAL:
             actions["partial_exit"] = 0.5 # 50%
             actions["log"] = "Partial Profit Booked (1.2 ATR Reached)"
             
-        # 3. Trailing Stop (Starts at 1.5 ATR)
-        # Soft Trail: Use Candle High/Low logic
-        if mfe >= (1.5 * self.atr):
-            self.trailing_active = True
-            
-        if self.trailing_active:
-            new_sl = self.current_sl
-            
-            if self.trade.tradeType == TradeType.CALL:
-                # Trail using Previous Candle Low (passed as 'low' here usually representing last completed candle low)
-                # But for safety, we allow standard ATR trailing or structured trailing.
-                # User asked: "Trail using Previous candle low (CALL)"
-                # If we are in the middle of a candle, we might not have 'prev candle low' easily unless passed context.
-                # Assuming 'low' arg is the relevant anchor.
-                
-                # Logic: Never move SL down
-                if low > self.current_sl:
-                    new_sl = low
-                    
-            else: # PUT
-                # Trail using Candle High
-                if high < self.current_sl:
-                    new_sl = high
-            
-            if new_sl != self.current_sl:
-                self.current_sl = new_sl
-                actions["update_sl"] = self.current_sl
-                actions["log"] = f"Trailing SL Updated to {new_sl}"
+        if act & A_TRAIL:
+            actions["update_sl"] = self.current_sl
+            actions["log"] = f"Trailing SL Updated to {self.current_sl}"
 
         return actions
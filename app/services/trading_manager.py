@@ -1,4 +1,6 @@
 import asyncio
+import time
+import traceback
 from app.services.websocket_client import UpstoxWebSocket
 from app.services.trend_analyzer import TrendAnalyzer
 from app.services.market_data_service import MarketDataService
@@ -32,6 +34,7 @@ class UserTrader:
         
         self.is_active = False
         self.bg_tasks = []
+        self._last_err_log = 0.0  # monotonic time of last full traceback from on_market_data
         
         # Managers
         self.risk_engine = RiskEngine(user_id, max_trades=5, max_loss_amt=2500)
@@ -150,8 +153,11 @@ class UserTrader:
 
         except Exception as e:
             print(f"Error in on_market_data: {e}")
-            import traceback
-            traceback.print_exc()
+            # Full tracebacks are expensive; a bad-frame storm should not stall the feed
+            now = time.monotonic()
+            if now - self._last_err_log > 1.0:
+                self._last_err_log = now
+                traceback.print_exc()
 
     async def handle_signal(self, signal: dict):
         """Callback when trend_analyzer finds a setup"""
@@ -325,7 +331,7 @@ class UserTrader:
                         "pcr": pcr,
                         "spot_price": market_status,
                         "indicators": {
-                            "vwap": state.vwap_cum_vol_price / state.vwap_cum_vol if state.vwap_cum_vol > 0 else 0,
+                            "vwap": self.analyzer.get_vwap(symbol_index),
                             # EMA/Supertrend are calculated on the fly in Analyzer, 
                             # we could store the last calculated values if we cached them.
                         }
@@ -377,7 +383,7 @@ class UserTrader:
                  today = datetime.now().date()
                  todays_candles = [c for c in history if c['timestamp'].date() == today]
                  for c in todays_candles:
-                     self.analyzer._calculate_vwap(state, c)
+                     self.analyzer._calculate_vwap(symbol_index, c)
                      
                  print(f"[OK] Warmup Complete. Loaded {len(history)} candles.")
         except Exception as e:
@@ -416,6 +422,9 @@ class UserTrader:
             task.cancel()
         self.bg_tasks = []
         
+        await self.market_data_service.close()
+        self.analyzer.clear_pattern_memo()
+        
         await redis_manager.publish("trading:events", {
             "type": "STATUS",
             "user_id": self.user_id,
@@ -1,15 +1,36 @@
+import os
+import threading
 from typing import List, Dict, Any, Tuple, Optional
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, time, timedelta
+import numpy as np
 import pandas as pd
 import pandas_ta as ta
 from dataclasses import dataclass, field
 from app.models.trade import TradeType
-from app.utils.patterns import identify_patterns, is_strong_candle
+from app.services import _indicator_kernels as kernels
+from app.utils.patterns import identify_patterns, identify_patterns_batch, is_strong_candle
 
 # -----------------------------------------------------------------------------
 # CONSTANTS & CONFIGURATION
 # -----------------------------------------------------------------------------
 
+# Shared pool for multi-symbol batch pattern scans; the kernels release the GIL.
+# Created on first use so the live trading path never starts its threads.
+_batch_pool: Optional[ThreadPoolExecutor] = None
+_batch_pool_lock = threading.Lock()
+
+def _get_batch_pool() -> ThreadPoolExecutor:
+    global _batch_pool
+    with _batch_pool_lock:
+        if _batch_pool is None:
+            _batch_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="patterns")
+        return _batch_pool
+
+# Candle fields loaded into DataFrames (candle dicts may carry extra keys)
+CANDLE_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
 class Config:
     # Risk & Strategy
     ATR_PERIOD = 14
@@ -30,12 +51,58 @@ class Config:
 class MarketState:
     """Holds state for a single instrument"""
     candles: List[Dict] = field(default_factory=list)
-    vwap: Dict = field(default_factory=lambda: {'cum_pv': 0.0, 'cum_vol': 0.0, 'last_reset': None})
-    orb: Dict = field(default_factory=lambda: {'high': 0.0, 'low': 0.0, 'set': False})
     pcr: float = 1.0
     cpr: Dict = field(default_factory=lambda: {'tc': 0, 'bc': 0, 'pivot': 0})
     oi_history: List[Dict] = field(default_factory=list) # [{'timestamp': ..., 'pcr': ..., 'call_oi': ..., 'put_oi': ...}]
     last_signal_time: Optional[datetime] = None
+    # Rolling windows over the last closed candles (volume SMA20 / range avg5), kept as running sums
+    vol_window: deque = field(default_factory=lambda: deque(maxlen=20))
+    vol_sum: float = 0.0
+    range_window: deque = field(default_factory=lambda: deque(maxlen=5))
+    range_sum: float = 0.0
+    last_rolled: Optional[Dict] = None # Last closed candle pushed into the windows
+    # Patterns of the last analyzed candle (one entry per symbol), reused for repeat ticks
+    pattern_sig: Optional[tuple] = None
+    pattern_prev: Optional[Dict] = None
+    patterns: Optional[Dict] = None
+
+class _SymbolColumns:
+    """
+    Structure-of-Arrays base: one NumPy column per field, one row per symbol.
+    Rows are assigned on first use via symbol_to_idx; columns grow by doubling.
+    """
+    COLUMNS: Dict[str, Tuple[Any, Any]] = {} # name -> (dtype, initial value)
+
+    def __init__(self, capacity: int = 16):
+        self.symbol_to_idx: Dict[str, int] = {}
+        self._capacity = capacity
+        for name, (dtype, init) in self.COLUMNS.items():
+            setattr(self, name, np.full(capacity, init, dtype=dtype))
+
+    def idx(self, symbol: str) -> int:
+        i = self.symbol_to_idx.get(symbol)
+        if i is None:
+            i = len(self.symbol_to_idx)
+            if i == self._capacity:
+                self._grow()
+            self.symbol_to_idx[symbol] = i
+        return i
+
+    def _grow(self):
+        old = self._capacity
+        self._capacity = old * 2
+        for name, (dtype, init) in self.COLUMNS.items():
+            col = np.full(self._capacity, init, dtype=dtype)
+            col[:old] = getattr(self, name)
+            setattr(self, name, col)
+
+class VwapStore(_SymbolColumns):
+    """Intraday VWAP accumulators per symbol"""
+    COLUMNS = {
+        'cum_pv': (np.float64, 0.0),
+        'cum_vol': (np.float64, 0.0),
+        'last_reset': ('datetime64[D]', np.datetime64('NaT')),
+    }
 
 class TrendAnalyzer:
     """
@@ -46,6 +113,7 @@ class TrendAnalyzer:
     def __init__(self, user_id: str):
         self.user_id = user_id
         self.state: Dict[str, MarketState] = {} # instrument_key -> MarketState
+        self.vwap_store = VwapStore()
         
     def _get_state(self, symbol: str) -> MarketState:
         if symbol not in self.state:
@@ -95,7 +163,7 @@ class TrendAnalyzer:
         if not candles:
             return pd.DataFrame()
             
-        df = pd.DataFrame(candles)
+        df = pd.DataFrame(candles, columns=CANDLE_COLUMNS)
         df['timestamp'] = pd.to_datetime(df['timestamp'])
         df.set_index('timestamp', inplace=True)
         
@@ -138,12 +206,21 @@ class TrendAnalyzer:
         """
         s = self._get_state(instrument_key)
         
+        # Normalise volume to float once at ingest; pattern checks read candle['volume'] directly
+        vol = candle.get('volume', 0)
+        if type(vol) is not float:
+            candle['volume'] = float(vol)
+        
         # 1. Update Candle Store
         # Ensure timestamp uniqueness
         if s.candles and s.candles[-1]['timestamp'] == candle['timestamp']:
+            self._remove_vwap(instrument_key, s.candles[-1]) # Replaced below, counted once
             s.candles[-1] = candle # Update current minute
         else:
+            if s.candles:
+                self._roll_history(s, s.candles[-1]) # Previous minute is now closed
             s.candles.append(candle)
+        self._calculate_vwap(instrument_key, candle)
             
         # Keep manageable history
         if len(s.candles) > 300:
@@ -155,6 +232,133 @@ class TrendAnalyzer:
         # 2. Analyze
         return self.analyze_scalping_signals(instrument_key, s)
 
+    def process_candles_batch(self, instrument_key: str, ohlcv: np.ndarray, is_index: bool = False) -> Dict:
+        """
+        Ingest many 1-min candles at once (replay/backfill), then analyze only the last one.
+        ohlcv: (n, 6) array of open/high/low/close/volume/ts_ms, oldest first, one row per minute.
+        Candles, rolling windows and VWAP end up as after n process_tick calls, but with one
+        indicator pass instead of n.
+        """
+        rows = np.asarray(ohlcv, dtype=np.float64)
+        if len(rows) == 0:
+            return {}
+        s = self._get_state(instrument_key)
+
+        candles = [
+            {'timestamp': datetime.fromtimestamp(ts / 1000), 'open': o, 'high': h, 'low': l, 'close': c, 'volume': v}
+            for o, h, l, c, v, ts in rows.tolist()
+        ]
+
+        # 1. Update Candle Store (a first row for the current minute replaces it, as in process_tick)
+        if s.candles and s.candles[-1]['timestamp'] == candles[0]['timestamp']:
+            self._remove_vwap(instrument_key, s.candles[-1])
+            s.candles[-1] = candles[0]
+            s.candles.extend(candles[1:])
+            closed = candles[:-1]
+        else:
+            closed = s.candles[-1:] + candles[:-1]
+            s.candles.extend(candles)
+
+        # Only the newest closed candles can still be inside the rolling windows
+        for c in closed[-s.vol_window.maxlen:]:
+            self._roll_history(s, c)
+
+        if len(s.candles) > 300:
+            s.candles = s.candles[-300:]
+
+        self._accumulate_vwap(instrument_key, candles, rows)
+
+        if not is_index or len(s.candles) < 50:
+            return {}
+
+        # 2. Analyze
+        return self.analyze_scalping_signals(instrument_key, s)
+
+    def _roll_history(self, state: MarketState, closed: Dict):
+        """O(1) update of the rolling volume/range sums with a just-closed candle"""
+        vol = closed['volume']
+        q = state.vol_window
+        if len(q) == q.maxlen:
+            state.vol_sum -= q[0]
+        q.append(vol)
+        state.vol_sum += vol
+
+        rng = closed['high'] - closed['low']
+        q = state.range_window
+        if len(q) == q.maxlen:
+            state.range_sum -= q[0]
+        q.append(rng)
+        state.range_sum += rng
+        state.last_rolled = closed
+
+    def _history_averages(self, state: MarketState) -> Tuple[Optional[float], Optional[float]]:
+        """
+        (avg_vol, avg_range) over the candles preceding the current one, or None for
+        either when its window does not cover that history yet (e.g. after a bulk warmup load).
+        """
+        candles = state.candles
+        # Windows only describe this list if its previous candle is the last one we rolled in
+        if len(candles) < 2 or candles[-2] is not state.last_rolled:
+            return None, None
+
+        n_prev = len(candles) - 1
+        vw, rw = state.vol_window, state.range_window
+        avg_vol = state.vol_sum / len(vw) if vw and len(vw) == min(n_prev, vw.maxlen) else None
+        avg_range = state.range_sum / len(rw) if rw and len(rw) == min(n_prev, rw.maxlen) else None
+        return avg_vol, avg_range
+
+    def _identify_patterns_memo(self, state: MarketState, avg_vol: Optional[float], avg_range: Optional[float]) -> Dict:
+        """
+        identify_patterns on state.candles, reused while the same minute is re-analyzed unchanged.
+        Matched on the last candle's timestamp *and* OHLCV plus the identity of the previous
+        (closed) candle, so a new minute, an intra-minute update or a new day never matches.
+        The returned dict is shared with the memo: treat it as read-only.
+        """
+        candles = state.candles
+        last = candles[-1]
+        previous = candles[-2] if len(candles) > 1 else None
+        sig = (last['timestamp'], last['open'], last['high'], last['low'], last['close'], last['volume'])
+        if state.patterns is not None and state.pattern_sig == sig and state.pattern_prev is previous:
+            return state.patterns
+
+        state.patterns = identify_patterns(candles, avg_vol=avg_vol, avg_range=avg_range)
+        state.pattern_sig = sig
+        state.pattern_prev = previous
+        return state.patterns
+
+    def clear_pattern_memo(self):
+        """Drop the memoized patterns of every symbol (e.g. when the session stops)"""
+        for s in self.state.values():
+            s.pattern_sig = s.pattern_prev = s.patterns = None
+
+    def get_avg_volume(self, symbol: str) -> Optional[float]:
+        """SMA(Volume, 20) of the closed candles for symbol, if the rolling window is warm"""
+        return self._history_averages(self._get_state(symbol))[0]
+
+    def process_symbols_batch(self, symbols_ohlcv: Dict[str, np.ndarray]) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        Run identify_patterns_batch for many symbols at once (replay/backtests).
+        symbols_ohlcv: symbol -> (n, 6) open/high/low/close/volume/ts_ms array, the same layout
+        as process_candles_batch (the timestamp column is not needed and may be omitted).
+        Symbols are spread over the shared thread pool, each on the serial kernel.
+        """
+        columns = {}
+        for symbol, ohlcv in symbols_ohlcv.items():
+            arr = np.asarray(ohlcv)
+            if arr.ndim != 2 or arr.shape[1] not in (5, 6):
+                raise ValueError(f"{symbol}: expected an (n, 6) open/high/low/close/volume/ts_ms array, got shape {arr.shape}")
+            columns[symbol] = arr[:, :5].T
+
+        pool = _get_batch_pool()
+        futures = {
+            pool.submit(identify_patterns_batch, *cols, parallel=False): symbol
+            for symbol, cols in columns.items()
+        }
+        results = {}
+        for fut in as_completed(futures):
+            results[futures[fut]] = fut.result()
+        return results
+
     def analyze_scalping_signals(self, symbol: str, state: MarketState) -> Dict:
         candles = state.candles
         last_candle = candles[-1]
@@ -178,12 +382,7 @@ class TrendAnalyzer:
         tf5_trend = "NEUTRAL"
         
         if not df_5m.empty and len(df_5m) > 10:
-             # TA-Lib/Pandas-TA EMA might return Series or DataFrame depending on version/config
-             ema_series = df_5m.ta.ema(length=21)
-             if isinstance(ema_series, pd.DataFrame):
-                 ema_series = ema_series.iloc[:, 0]
-                 
-             df_5m['ema21'] = ema_series
+             df_5m['ema21'] = kernels.ema(df_5m['close'].to_numpy(), 21)
              
              last_5m = df_5m.iloc[-1]
              # Simple trend check: Close > EMA21 on 5m
@@ -195,18 +394,16 @@ class TrendAnalyzer:
                      tf5_trend = "BEARISH"
 
         # --- Indicator Calculation (1min) ---
-        df = pd.DataFrame(candles)
-        df['ema9'] = df.ta.ema(length=9)
-        df['ema21'] = df.ta.ema(length=21)
-        df['rsi'] = df.ta.rsi(length=14)
-        df['atr'] = df.ta.atr(length=Config.ATR_PERIOD)
-        
-        # ADX
-        adx_df = df.ta.adx(length=14)
-        if adx_df is not None and not adx_df.empty:
-            df['adx'] = adx_df['ADX_14']
-        else:
-            df['adx'] = 0
+        df = pd.DataFrame(candles, columns=CANDLE_COLUMNS)
+        # EMA/RSI/ATR/ADX via the compiled kernels (pandas_ta semantics, see _indicator_kernels)
+        high = df['high'].to_numpy(dtype=np.float64)
+        low = df['low'].to_numpy(dtype=np.float64)
+        close = df['close'].to_numpy(dtype=np.float64)
+        df['ema9'] = kernels.ema(close, 9)
+        df['ema21'] = kernels.ema(close, 21)
+        df['rsi'] = kernels.rsi(close, 14)
+        df['atr'] = kernels.atr(high, low, close, Config.ATR_PERIOD)
+        df['adx'] = kernels.adx(high, low, close, 14)
 
         # Supertrend (7, 3) - New Addition
         st = df.ta.supertrend(length=7, multiplier=3)
@@ -230,7 +427,9 @@ class TrendAnalyzer:
              df['st_dir'] = 0
 
         # VWAP (Intraday)
-        vwap = self._calculate_vwap(state, last_candle)
+        vwap = self.get_vwap(symbol) # Accumulated at ingest (process_tick)
+        if vwap == 0: # No volume yet (index feeds carry none): fall back to the typical price
+            vwap = (last_candle['high'] + last_candle['low'] + current_price) / 3
         
         # --- Current Values ---
         c = df.iloc[-1]
@@ -250,7 +449,8 @@ class TrendAnalyzer:
         
         # Pattern Recognition
         # We use a helper that looks at last few candles
-        patterns = identify_patterns(candles)
+        avg_vol, avg_range = self._history_averages(state)
+        patterns = self._identify_patterns_memo(state, avg_vol, avg_range)
         
         # Strategy 1: Trend Pullback w/ Pattern
         # Pre-req: ADX > 20 (Trend exists)
@@ -349,17 +549,57 @@ class TrendAnalyzer:
         if Config.TIME_AFTERNOON_START <= t <= Config.TIME_AFTERNOON_END: return True
         return False
 
-    def _calculate_vwap(self, state: MarketState, candle: Dict) -> float:
-        """Accumulate VWAP safely"""
-        # Reset if new day (handled by caller passing fresh data usually? 
-        # No, we must handle day change here if we sustain state)
-        # For simplicity, we assume one process run = one day or reset explicitly.
-        
+    def _calculate_vwap(self, symbol: str, candle: Dict) -> float:
+        """Accumulate VWAP safely (resets on the first candle of a new day)"""
+        store = self.vwap_store
+        i = store.idx(symbol)
+
+        day = np.datetime64(candle['timestamp'].date(), 'D')
+        if store.last_reset[i] != day:
+            store.cum_pv[i] = 0.0
+            store.cum_vol[i] = 0.0
+            store.last_reset[i] = day
+
         typ = (candle['high'] + candle['low'] + candle['close']) / 3
         vol = candle['volume']
-        
-        state.vwap['cum_pv'] += typ * vol
-        state.vwap['cum_vol'] += vol
-        
-        if state.vwap['cum_vol'] == 0: return typ
-        return state.vwap['cum_pv'] / state.vwap['cum_vol']
+
+        store.cum_pv[i] += typ * vol
+        store.cum_vol[i] += vol
+
+        if store.cum_vol[i] == 0: return typ
+        return float(store.cum_pv[i] / store.cum_vol[i])
+
+    def _remove_vwap(self, symbol: str, candle: Dict):
+        """Take a candle's contribution back out of today's VWAP (it is being replaced)"""
+        store = self.vwap_store
+        i = store.idx(symbol)
+        if store.last_reset[i] != np.datetime64(candle['timestamp'].date(), 'D'):
+            return # Never counted in the current session
+        store.cum_pv[i] -= (candle['high'] + candle['low'] + candle['close']) / 3 * candle['volume']
+        store.cum_vol[i] -= candle['volume']
+
+    def _accumulate_vwap(self, symbol: str, candles: List[Dict], rows: np.ndarray):
+        """Vectorised _calculate_vwap over a run of candles (rows: their open/high/low/close/volume columns)"""
+        store = self.vwap_store
+        i = store.idx(symbol)
+
+        # Only the latest day survives the daily reset
+        days = np.array([c['timestamp'].date() for c in candles], dtype='datetime64[D]')
+        day = days[-1]
+        if store.last_reset[i] != day:
+            store.cum_pv[i] = 0.0
+            store.cum_vol[i] = 0.0
+            store.last_reset[i] = day
+
+        today = rows[days == day]
+        typ = (today[:, 1] + today[:, 2] + today[:, 3]) / 3
+        store.cum_pv[i] += typ @ today[:, 4]
+        store.cum_vol[i] += today[:, 4].sum()
+
+    def get_vwap(self, symbol: str) -> float:
+        """Current session VWAP for symbol (0 if nothing accumulated yet)"""
+        store = self.vwap_store
+        i = store.symbol_to_idx.get(symbol)
+        if i is None or store.cum_vol[i] == 0:
+            return 0.0
+        return float(store.cum_pv[i] / store.cum_vol[i])
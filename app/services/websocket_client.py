@@ -1,10 +1,112 @@
 import asyncio
+import hashlib
 import json
+import os
+import sys
+import threading
+from collections import OrderedDict, deque
 import upstox_client
 from upstox_client.rest import ApiException
+from app.config import settings
+
+TICK_QUEUE_SIZE = 8192
+TICK_BATCH_SIZE = 64
+
+DEFAULT_SYMBOLS = (
+    "NSE_INDEX|Nifty Bank",
+    "NSE_INDEX|Nifty 50",
+)
+
+# ApiClient spins up its own ThreadPool on construction, so share one per access token.
+# Keyed by a hash of the token so the cache itself never holds bearer credentials.
+API_CLIENT_CACHE_SIZE = 32
+_api_clients: "OrderedDict[str, upstox_client.ApiClient]" = OrderedDict()
+
+
+def _token_key(access_token: str) -> str:
+    return hashlib.sha256(access_token.encode()).hexdigest()
+
+
+def _get_api_client(access_token: str) -> upstox_client.ApiClient:
+    """Return the cached ApiClient for this token, creating it on first use (LRU bounded)"""
+    key = _token_key(access_token)
+    api_client = _api_clients.get(key)
+    if api_client is not None:
+        _api_clients.move_to_end(key)
+        return api_client
+
+    configuration = upstox_client.Configuration()
+    configuration.access_token = access_token
+    api_client = upstox_client.ApiClient(configuration)
+
+    _api_clients[key] = api_client
+    if len(_api_clients) > API_CLIENT_CACHE_SIZE:
+        _api_clients.popitem(last=False)
+    return api_client
+
+
+def _release_api_client(access_token: str):
+    """Drop the cached ApiClient for this token (its pool is closed once nothing else references it)"""
+    _api_clients.pop(_token_key(access_token), None)
+
+
+# CPUs this process may run on, read once at import: after the first pin the event loop
+# thread's own mask is a single CPU, so it must not be re-read from there
+_ALLOWED_CPUS = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else []
+
+
+def _pin_sdk_threads(threads_before: set):
+    """
+    Pin the calling (event loop) thread to the first allowed CPU and any thread
+    started since `threads_before` (the SDK receiver) to the second, so the two
+    stop migrating across cores while handing the GIL back and forth. Linux only.
+    Uses the process-wide CPU set captured at import, so every streamer started
+    later gets the same split.
+    """
+    if not hasattr(os, "sched_setaffinity"):
+        print("⚠️ PIN_SDK_THREAD: CPU affinity not supported on this platform, not pinning")
+        return
+
+    if len(_ALLOWED_CPUS) < 2:
+        print(f"⚠️ PIN_SDK_THREAD: only {len(_ALLOWED_CPUS)} CPU available, not pinning")
+        return
+
+    loop_cpu, sdk_cpu = _ALLOWED_CPUS[0], _ALLOWED_CPUS[1]
+    try:
+        os.sched_setaffinity(0, {loop_cpu})  # 0 = calling thread
+        for t in threading.enumerate():
+            if t.ident not in threads_before and t.native_id is not None:
+                os.sched_setaffinity(t.native_id, {sdk_cpu})
+    except OSError as e:
+        print(f"⚠️ Could not pin SDK thread: {e}")
+
+
+def _coalesce(batch: list) -> dict:
+    """
+    Merge queued messages into one, keeping the latest feed per instrument.
+    A batch only holds more than one message when the callback is slower than the
+    feed, so this sheds stale intermediate ticks instead of letting the backlog grow.
+    """
+    if len(batch) == 1:
+        return batch[0]
+
+    feeds = {}
+    for message in batch:
+        feeds.update(message["feeds"])
+
+    merged = dict(batch[-1])
+    merged["feeds"] = feeds
+    return merged
 
 
 class UpstoxWebSocket:
+    # Fixed attribute layout: these are read on every tick from the SDK thread
+    __slots__ = (
+        "access_token", "user_id", "config", "on_data_callback", "symbols",
+        "streamer", "_initialized", "_debug", "_loop",
+        "_tick_q", "_tick_ready", "_consumer", "_stop_event",
+    )
+
     def __init__(self, access_token: str, user_id: str = None, config: dict = None, on_data_callback=None):
         """
         access_token: Upstox OAuth Access Token
@@ -17,13 +119,20 @@ class UpstoxWebSocket:
         self.config = config or {}
         self.on_data_callback = on_data_callback
 
-        self.symbols = self.config.get("symbols", [
-            "NSE_INDEX|Nifty Bank",
-            "NSE_INDEX|Nifty 50",
-        ])
+        # Built once and reused for every (re)subscribe in on_open
+        self.symbols = [sys.intern(s) for s in self.config.get("symbols", DEFAULT_SYMBOLS)]
 
         self.streamer = None
         self._initialized = False
+        self._debug = settings.DEBUG  # Per-tick diagnostics, resolved once
+        self._loop = None  # Event loop running start(); SDK callbacks are marshalled onto it
+
+        # Ticks are buffered here by the SDK thread and drained in batches by one consumer task.
+        # deque.append is thread-safe and maxlen drops the oldest tick when the consumer lags.
+        self._tick_q = deque(maxlen=TICK_QUEUE_SIZE)
+        self._tick_ready = asyncio.Event()
+        self._consumer = None
+        self._stop_event = asyncio.Event()  # Set by stop(); start() idles on it
 
     # ----------------------------------------------------------------------
     # Callback: Handle incoming market data
@@ -33,28 +142,44 @@ class UpstoxWebSocket:
         try:
             # The SDK automatically decodes protobuf messages
             # message is already a Python dict
-            feeds = message.get("feeds", {})
+            # market_info / keep-alive frames carry no feeds: drop them before they reach the queue
+            feeds = message.get("feeds")
             
             if not feeds:
                 return
 
-            # If a callback is registered, pass the data asynchronously
-            if self.on_data_callback:
-                # We need to ensure this is run in the event loop
-                try:
-                    loop = asyncio.get_event_loop()
-                    if loop.is_running():
-                        loop.create_task(self.on_data_callback(message))
-                except RuntimeError:
-                    # Fallback if no loop (should not happen in async app)
-                    pass
-            else:
+            # If a callback is registered, enqueue for the consumer task started in start().
+            # This runs on the SDK's receiver thread: only wake the loop if the consumer is idle.
+            if self.on_data_callback is not None:
+                ready = self._tick_ready
+                self._tick_q.append(message)
+                if not ready.is_set():
+                    self._loop.call_soon_threadsafe(ready.set)
+            elif self._debug:
                 # Default logging if no callback
                 print(f"📈 Tick Data: {len(feeds)} instruments updated")
                 
         except Exception as e:
             print(f"❌ Error processing message: {e}")
 
+    async def _drain(self):
+        """Single consumer: drain buffered ticks in batches and feed them to the callback"""
+        q = self._tick_q
+        ready = self._tick_ready
+        callback = self.on_data_callback
+        while True:
+            await ready.wait()
+            # Clear before draining so a tick appended mid-drain re-arms the event
+            ready.clear()
+            while q:
+                batch = []
+                while q and len(batch) < TICK_BATCH_SIZE:
+                    batch.append(q.popleft())
+                try:
+                    await callback(_coalesce(batch))
+                except Exception as e:
+                    print(f"❌ Error in data callback: {e}")
+
     def on_open(self):
         """Called when WebSocket connection opens"""
         print(f"✅ WebSocket Connected for {self.user_id}")
@@ -79,12 +204,8 @@ class UpstoxWebSocket:
         if not self._initialized:
             print("🔌 Initializing Upstox WebSocket…")
             
-            # Create configuration and set access token
-            configuration = upstox_client.Configuration()
-            configuration.access_token = self.access_token
-            
-            # Create API client
-            api_client = upstox_client.ApiClient(configuration)
+            # Shared API client for this access token
+            api_client = _get_api_client(self.access_token)
             
             # Initialize streamer with API client
             self.streamer = upstox_client.MarketDataStreamerV3(api_client)
@@ -105,21 +226,30 @@ class UpstoxWebSocket:
         try:
             # Initialize streamer
             self._initialize_streamer()
+            self._loop = asyncio.get_running_loop()
+            if self.on_data_callback is not None:
+                self._consumer = asyncio.create_task(self._drain())
             
             # Connect to WebSocket
             # Note: streamer.connect() is usually blocking or threaded in some SDKs.
             # Upstox V3 Python SDK streamer is threaded. 
             # We keep the main loop alive here.
+            threads_before = {t.ident for t in threading.enumerate()}
             self.streamer.connect()
+            if settings.PIN_SDK_THREAD:
+                _pin_sdk_threads(threads_before)
             
-            # Keep the connection alive
-            while True:
-                await asyncio.sleep(1)
+            # Keep the connection alive until stop() is called
+            await self._stop_event.wait()
                 
         except ApiException as e:
             print(f"❌ API Exception: {e}")
         except Exception as e:
             print(f"❌ Connection error: {e}")
+        finally:
+            if self._consumer:
+                self._consumer.cancel()
+                self._consumer = None
 
     # ----------------------------------------------------------------------
     # Stop WebSocket Connection
@@ -129,6 +259,9 @@ class UpstoxWebSocket:
         if self.streamer:
             self.streamer.disconnect()
             print("🔌 WebSocket disconnected")
+        _release_api_client(self.access_token)
+        if self._loop:
+            self._loop.call_soon_threadsafe(self._stop_event.set)
 
     # ----------------------------------------------------------------------
     # Change subscription (add/remove instruments)
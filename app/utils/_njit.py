@@ -0,0 +1,24 @@
+"""
+Optional Numba support.
+
+`njit` / `prange` fall back to no-ops when numba is not installed, so kernels
+still import and run as plain Python. Callers that have a faster NumPy path
+should check HAS_NUMBA before preferring a kernel.
+"""
+
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """Stand-in for numba.njit: returns the function unchanged (bare or parametrized use)"""
+        def wrap(fn):
+            fn.py_func = fn  # Same attribute numba exposes for the uncompiled function
+            return fn
+
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return wrap(args[0])
+        return wrap
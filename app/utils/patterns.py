@@ -1,10 +1,27 @@
-from typing import List, Dict, Any, Tuple
+import types
+from typing import List, Dict, Any, Tuple, NamedTuple, Optional
+import numpy as np
+from app.utils._njit import njit, prange, HAS_NUMBA
 
-def get_candle_metrics(candle: Dict[str, Any]) -> Dict[str, float]:
+class CandleMetrics(NamedTuple):
+    """Derived geometry of a single candle (see get_candle_metrics)"""
+    body: float
+    upper_wick: float
+    lower_wick: float
+    total_range: float
+    is_green: bool
+    high: float
+    low: float
+    close: float
+    open: float
+
+def get_candle_metrics(candle: Dict[str, Any]) -> CandleMetrics:
     """
     Calculate basic metrics for a single candle.
     Returns:
-        Dict with keys: 'body', 'upper_wick', 'lower_wick', 'total_range', 'is_green'
+        CandleMetrics with fields: body, upper_wick, lower_wick, total_range, is_green, high, low, close, open
+    Pure: the candle dict is not touched (it is also persisted/serialized as-is).
+    identify_patterns computes these once per candle and shares them across its checks.
     """
     open_p = candle['open']
     close_p = candle['close']
@@ -15,52 +32,52 @@ def get_candle_metrics(candle: Dict[str, Any]) -> Dict[str, float]:
     total_range = high_p - low_p
     is_green = close_p > open_p
     
-    if is_green:
-        upper_wick = high_p - close_p
-        lower_wick = open_p - low_p
-    else:
-        upper_wick = high_p - open_p
-        lower_wick = close_p - low_p
+    # Wicks hang off the body's top/bottom whatever the candle colour
+    upper_wick = high_p - max(open_p, close_p)
+    lower_wick = min(open_p, close_p) - low_p
 
-    return {
-        "body": body,
-        "upper_wick": upper_wick,
-        "lower_wick": lower_wick,
-        "total_range": total_range,
-        "is_green": is_green,
-        "high": high_p,
-        "low": low_p,
-        "close": close_p,
-        "open": open_p
-    }
+    return CandleMetrics(body, upper_wick, lower_wick, total_range, is_green, high_p, low_p, close_p, open_p)
 
-def is_strong_candle(candle: Dict[str, Any]) -> str:
-    """
-    Check if candle is STRONG_BULL or STRONG_BEAR.
-    Definition:
-    - Body >= 60% of Total Range
-    - Bullish: Close in top 25% of range
-    - Bearish: Close in bottom 25% of range
-    """
-    m = get_candle_metrics(candle)
-    if m['total_range'] == 0:
+def _strong_candle_impl(m: CandleMetrics) -> str:
+    """is_strong_candle on precomputed metrics"""
+    if m.total_range == 0:
         return "NEUTRAL"
 
-    body_pct = m['body'] / m['total_range']
+    body_pct = m.body / m.total_range
     if body_pct < 0.6:
         return "NEUTRAL"
     
     # Check close position relative to range
     # Position: (Close - Low) / Range
-    close_pos = (m['close'] - m['low']) / m['total_range']
+    close_pos = (m.close - m.low) / m.total_range
 
-    if m['is_green'] and close_pos >= 0.75:
+    if m.is_green and close_pos >= 0.75:
         return "STRONG_BULL"
-    elif not m['is_green'] and close_pos <= 0.25:
+    elif not m.is_green and close_pos <= 0.25:
         return "STRONG_BEAR"
     
     return "NEUTRAL"
 
+def is_strong_candle(candle: Dict[str, Any]) -> str:
+    """
+    Check if candle is STRONG_BULL or STRONG_BEAR.
+    Definition:
+    - Body >= 60% of Total Range
+    - Bullish: Close in top 25% of range
+    - Bearish: Close in bottom 25% of range
+    """
+    return _strong_candle_impl(get_candle_metrics(candle))
+
+def _hammer_impl(m: CandleMetrics) -> bool:
+    """is_hammer on precomputed metrics"""
+    if m.total_range == 0: return False
+
+    return (
+        m.lower_wick >= 2 * m.body and
+        m.upper_wick <= 0.3 * m.body and
+        m.body <= 0.3 * m.total_range
+    )
+
 def is_hammer(candle: Dict[str, Any]) -> bool:
     """
     Bullish Hammer:
@@ -68,13 +85,16 @@ def is_hammer(candle: Dict[str, Any]) -> bool:
     - Upper Wick <= 0.3 * Body (Tiny/No upper wick)
     - Body <= 0.3 * Total Range (Small body)
     """
-    m = get_candle_metrics(candle)
-    if m['total_range'] == 0: return False
+    return _hammer_impl(get_candle_metrics(candle))
+
+def _shooting_star_impl(m: CandleMetrics) -> bool:
+    """is_shooting_star on precomputed metrics"""
+    if m.total_range == 0: return False
 
     return (
-        m['lower_wick'] >= 2 * m['body'] and
-        m['upper_wick'] <= 0.3 * m['body'] and
-        m['body'] <= 0.3 * m['total_range']
+        m.upper_wick >= 2 * m.body and
+        m.lower_wick <= 0.3 * m.body and
+        m.body <= 0.3 * m.total_range
     )
 
 def is_shooting_star(candle: Dict[str, Any]) -> bool:
@@ -84,14 +104,27 @@ def is_shooting_star(candle: Dict[str, Any]) -> bool:
     - Lower Wick <= 0.3 * Body (Tiny/No lower wick)
     - Body <= 0.3 * Total Range (Small body)
     """
-    m = get_candle_metrics(candle)
-    if m['total_range'] == 0: return False
+    return _shooting_star_impl(get_candle_metrics(candle))
 
-    return (
-        m['upper_wick'] >= 2 * m['body'] and
-        m['lower_wick'] <= 0.3 * m['body'] and
-        m['body'] <= 0.3 * m['total_range']
-    )
+def _engulfing(curr_m: CandleMetrics, prev_m: CandleMetrics) -> str:
+    """
+    Both engulfing checks in one pass: 'BULL', 'BEAR' or 'NONE'.
+    Opposite colours are required, so at most one direction can match.
+    """
+    if curr_m.is_green == prev_m.is_green:
+        return 'NONE'
+
+    if curr_m.is_green:
+        # Basic Engulfing Logic
+        if curr_m.open <= prev_m.close and curr_m.close >= prev_m.open:
+            return 'BULL'
+    elif curr_m.open >= prev_m.close and curr_m.close <= prev_m.open:
+        return 'BEAR'
+    return 'NONE'
+
+def _bullish_engulfing_impl(curr_m: CandleMetrics, prev_m: CandleMetrics) -> bool:
+    """is_bullish_engulfing on precomputed metrics"""
+    return _engulfing(curr_m, prev_m) == 'BULL'
 
 def is_bullish_engulfing(current: Dict[str, Any], previous: Dict[str, Any]) -> bool:
     """
@@ -101,17 +134,11 @@ def is_bullish_engulfing(current: Dict[str, Any], previous: Dict[str, Any]) -> b
     - Current Open <= Previous Close
     - Current Close >= Previous Open
     """
-    prev_m = get_candle_metrics(previous)
-    curr_m = get_candle_metrics(current)
+    return _bullish_engulfing_impl(get_candle_metrics(current), get_candle_metrics(previous))
 
-    if prev_m['is_green'] or not curr_m['is_green']:
-        return False
-    
-    # Basic Engulfing Logic
-    return (
-        curr_m['open'] <= prev_m['close'] and 
-        curr_m['close'] >= prev_m['open']
-    )
+def _bearish_engulfing_impl(curr_m: CandleMetrics, prev_m: CandleMetrics) -> bool:
+    """is_bearish_engulfing on precomputed metrics"""
+    return _engulfing(curr_m, prev_m) == 'BEAR'
 
 def is_bearish_engulfing(current: Dict[str, Any], previous: Dict[str, Any]) -> bool:
     """
@@ -121,15 +148,13 @@ def is_bearish_engulfing(current: Dict[str, Any], previous: Dict[str, Any]) -> b
     - Current Open >= Previous Close
     - Current Close <= Previous Open
     """
-    prev_m = get_candle_metrics(previous)
-    curr_m = get_candle_metrics(current)
+    return _bearish_engulfing_impl(get_candle_metrics(current), get_candle_metrics(previous))
 
-    if not prev_m['is_green'] or curr_m['is_green']:
-        return False
-    
+def _inside_bar_impl(curr_m: CandleMetrics, prev_m: CandleMetrics) -> bool:
+    """is_inside_bar on precomputed metrics"""
     return (
-        curr_m['open'] >= prev_m['close'] and
-        curr_m['close'] <= prev_m['open']
+        curr_m.high < prev_m.high and
+        curr_m.low > prev_m.low
     )
 
 def is_inside_bar(current: Dict[str, Any], previous: Dict[str, Any]) -> bool:
@@ -169,18 +194,22 @@ def check_volume_breakout(current: Dict[str, Any], recent_candles: List[Dict[str
     if len(recent_candles) < 5: # Need some history
         return True # Default to True if not enough data to filter, or handle as neutral
     
-    # Calculate SMA Volume
-    vols = [float(c.get('volume', 0)) for c in recent_candles]
-    avg_vol = sum(vols) / len(vols)
+    # Calculate SMA Volume (candles carry a float 'volume', see TrendAnalyzer.process_tick)
+    total = 0.0
+    for c in recent_candles:
+        total += c['volume']
+    avg_vol = total / len(recent_candles)
     
-    curr_vol = float(current.get('volume', 0))
+    curr_vol = current['volume']
     
     return curr_vol > multiplier * avg_vol
 
-def identify_patterns(candles: List[Dict[str, Any]]) -> Dict[str, Any]:
+def identify_patterns(candles: List[Dict[str, Any]], avg_vol: Optional[float] = None, avg_range: Optional[float] = None) -> Dict[str, Any]:
     """
     Main aggregator function to check for patterns on the latest candle.
     Returns dictionary with detected pattern flags.
+    avg_vol / avg_range: optional precomputed averages of the previous 20 volumes / 5 ranges
+    (e.g. maintained as rolling sums by the caller); computed from `candles` when omitted.
     """
     if len(candles) < 2:
         return {}
@@ -190,18 +219,272 @@ def identify_patterns(candles: List[Dict[str, Any]]) -> Dict[str, Any]:
     
     # Recent history for averages (last 5 for range, last 20 for volume)
     # Exclude current candle for average calculations
-    history_5 = candles[-6:-1] if len(candles) >= 6 else candles[:-1]
-    history_20 = candles[-21:-1] if len(candles) >= 21 else candles[:-1]
+    if avg_range is None:
+        history_5 = candles[-6:-1] if len(candles) >= 6 else candles[:-1]
+        range_compression = is_range_compression(current, history_5)
+    else:
+        range_compression = avg_range != 0 and (current['high'] - current['low']) < 0.5 * avg_range
+
+    if avg_vol is None:
+        history_20 = candles[-21:-1] if len(candles) >= 21 else candles[:-1]
+        volume_support = check_volume_breakout(current, history_20, multiplier=1.2)
+    else:
+        # Same "not enough history" default as check_volume_breakout (< 5 previous candles)
+        volume_support = len(candles) < 6 or current['volume'] > 1.2 * avg_vol
+
+    # Compute metrics once per candle and share them across all checks
+    curr_m = get_candle_metrics(current)
+    prev_m = get_candle_metrics(previous)
+    engulfing = _engulfing(curr_m, prev_m)
 
     result = {
-        "strong_candle": is_strong_candle(current),
-        "is_hammer": is_hammer(current),
-        "is_shooting_star": is_shooting_star(current),
-        "is_bullish_engulfing": is_bullish_engulfing(current, previous),
-        "is_bearish_engulfing": is_bearish_engulfing(current, previous),
-        "is_inside_bar": is_inside_bar(current, previous),
-        "is_range_compression": is_range_compression(current, history_5),
-        "has_volume_support": check_volume_breakout(current, history_20, multiplier=1.2)
+        "strong_candle": _strong_candle_impl(curr_m),
+        "is_hammer": _hammer_impl(curr_m),
+        "is_shooting_star": _shooting_star_impl(curr_m),
+        "is_bullish_engulfing": engulfing == 'BULL',
+        "is_bearish_engulfing": engulfing == 'BEAR',
+        "is_inside_bar": _inside_bar_impl(curr_m, prev_m),
+        "is_range_compression": range_compression,
+        "has_volume_support": volume_support
     }
     
     return result
+
+def _trailing_mean(x: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Mean of the up-to-`window` values *before* each index, matching the
+    history slices used by identify_patterns. Returns (mean, count); mean is NaN where count is 0.
+    Sums are accumulated left to right (one vector add per lag) so results match sum() exactly.
+    """
+    n = len(x)
+    padded = np.concatenate((np.zeros(window, dtype=np.float64), x))
+    total = padded[0:n].copy()
+    for k in range(1, window):
+        total += padded[k:k + n]
+    count = np.minimum(np.arange(n), window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+    return mean, count
+
+def _patterns_np(o, h, l, c, v):
+    """NumPy batch kernel: returns the nine per-candle flag arrays (see identify_patterns_batch)"""
+    # --- Single-candle metrics ---
+    body = np.abs(c - o)
+    total_range = h - l
+    is_green = c > o
+    upper_wick = h - np.maximum(o, c)
+    lower_wick = np.minimum(o, c) - l
+    has_range = total_range != 0
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        body_pct = body / total_range
+        close_pos = (c - l) / total_range
+
+    strong = has_range & (body_pct >= 0.6)
+    strong_bull = strong & is_green & (close_pos >= 0.75)
+    strong_bear = strong & ~is_green & (close_pos <= 0.25)
+
+    small_body = has_range & (body <= 0.3 * total_range)
+    hammer = small_body & (lower_wick >= 2 * body) & (upper_wick <= 0.3 * body)
+    shooting_star = small_body & (upper_wick >= 2 * body) & (lower_wick <= 0.3 * body)
+
+    # --- Two-candle patterns (current vs previous) ---
+    n = len(c)
+    bull_engulf = np.zeros(n, dtype=np.bool_)
+    bear_engulf = np.zeros(n, dtype=np.bool_)
+    inside_bar = np.zeros(n, dtype=np.bool_)
+    bull_engulf[1:] = ~is_green[:-1] & is_green[1:] & (o[1:] <= c[:-1]) & (c[1:] >= o[:-1])
+    bear_engulf[1:] = is_green[:-1] & ~is_green[1:] & (o[1:] >= c[:-1]) & (c[1:] <= o[:-1])
+    inside_bar[1:] = (h[1:] < h[:-1]) & (l[1:] > l[:-1])
+
+    # --- History filters (last 5 ranges, last 20 volumes, excluding current) ---
+    avg_range, _ = _trailing_mean(total_range, 5)
+    avg_vol, vol_count = _trailing_mean(v, 20)
+    with np.errstate(invalid='ignore'):
+        range_compression = (avg_range != 0) & (total_range < 0.5 * avg_range)
+        volume_support = (vol_count < 5) | (v > 1.2 * avg_vol)
+
+    # Index 0 has no previous candle (identify_patterns returns {} there)
+    first = slice(0, min(n, 1))
+    for arr in (strong_bull, strong_bear, hammer, shooting_star, range_compression, volume_support):
+        arr[first] = False
+
+    return (strong_bull, strong_bear, hammer, shooting_star,
+            bull_engulf, bear_engulf, inside_bar, range_compression, volume_support)
+
+# Full-window sums with literal trip counts so the JIT can unroll them.
+# Same left-to-right order as sum() over the slice, so results stay bit-identical.
+@njit(inline='always')
+def _range_sum5(h, l, end):
+    total = 0.0
+    for j in range(5):
+        total += h[end - 5 + j] - l[end - 5 + j]
+    return total
+
+@njit(inline='always')
+def _sum20(v, end):
+    total = 0.0
+    for j in range(20):
+        total += v[end - 20 + j]
+    return total
+
+@njit(cache=True, parallel=True, nogil=True)
+def _patterns_nb(o, h, l, c, v):
+    """
+    Numba batch kernel: same flags as _patterns_np in one fused pass per candle.
+    Window sums are accumulated left to right (at most 20 adds) to match sum() exactly.
+    """
+    n = len(c)
+    strong_bull = np.zeros(n, dtype=np.bool_)
+    strong_bear = np.zeros(n, dtype=np.bool_)
+    hammer = np.zeros(n, dtype=np.bool_)
+    shooting_star = np.zeros(n, dtype=np.bool_)
+    bull_engulf = np.zeros(n, dtype=np.bool_)
+    bear_engulf = np.zeros(n, dtype=np.bool_)
+    inside_bar = np.zeros(n, dtype=np.bool_)
+    range_compression = np.zeros(n, dtype=np.bool_)
+    volume_support = np.zeros(n, dtype=np.bool_)
+
+    for i in prange(1, n):
+        oi, hi, li, ci = o[i], h[i], l[i], c[i]
+        body = abs(ci - oi)
+        total_range = hi - li
+        is_green = ci > oi
+        upper_wick = hi - max(oi, ci)
+        lower_wick = min(oi, ci) - li
+
+        if total_range != 0:
+            if body / total_range >= 0.6:
+                close_pos = (ci - li) / total_range
+                if is_green and close_pos >= 0.75:
+                    strong_bull[i] = True
+                elif not is_green and close_pos <= 0.25:
+                    strong_bear[i] = True
+            if body <= 0.3 * total_range:
+                hammer[i] = lower_wick >= 2 * body and upper_wick <= 0.3 * body
+                shooting_star[i] = upper_wick >= 2 * body and lower_wick <= 0.3 * body
+
+        po, pc = o[i - 1], c[i - 1]
+        prev_green = pc > po
+        bull_engulf[i] = (not prev_green) and is_green and oi <= pc and ci >= po
+        bear_engulf[i] = prev_green and (not is_green) and oi >= pc and ci <= po
+        inside_bar[i] = hi < h[i - 1] and li > l[i - 1]
+
+        if i >= 5:
+            avg_range = _range_sum5(h, l, i) / 5
+        else:
+            total = 0.0
+            for j in range(i):
+                total += h[j] - l[j]
+            avg_range = total / i
+        range_compression[i] = avg_range != 0 and total_range < 0.5 * avg_range
+
+        if i < 5:
+            volume_support[i] = True
+        elif i >= 20:
+            volume_support[i] = v[i] > 1.2 * (_sum20(v, i) / 20)
+        else:
+            total = 0.0
+            for j in range(i):
+                total += v[j]
+            volume_support[i] = v[i] > 1.2 * (total / i)
+
+    return (strong_bull, strong_bear, hammer, shooting_star,
+            bull_engulf, bear_engulf, inside_bar, range_compression, volume_support)
+
+def _renamed(fn, name: str):
+    """Copy of a plain function under another name (Numba's on-disk cache is keyed by
+    qualname and signature, not compile flags, so two builds of one function would collide)"""
+    copy = types.FunctionType(fn.__code__, fn.__globals__, name, fn.__defaults__, fn.__closure__)
+    copy.__qualname__ = name
+    return copy
+
+# Single-threaded build of the same kernel for callers that already parallelise
+# across symbols (nested prange launches oversubscribe, or abort on the workqueue layer)
+_patterns_nb_serial = njit(cache=True, nogil=True)(_renamed(_patterns_nb.py_func, "_patterns_nb_serial"))
+
+def _batch_flags(o, h, l, c, v, dtype, parallel: bool = True) -> tuple:
+    """Coerce inputs and run the available batch kernel (flag order as in PATTERN_BITS)"""
+    o = np.ascontiguousarray(o, dtype=dtype)
+    h = np.ascontiguousarray(h, dtype=dtype)
+    l = np.ascontiguousarray(l, dtype=dtype)
+    c = np.ascontiguousarray(c, dtype=dtype)
+    v = np.ascontiguousarray(v, dtype=np.float64)
+
+    if not HAS_NUMBA:
+        kernel = _patterns_np
+    else:
+        kernel = _patterns_nb if parallel else _patterns_nb_serial
+    return kernel(o, h, l, c, v)
+
+def identify_patterns_batch(o, h, l, c, v, dtype=np.float64, parallel: bool = True) -> Dict[str, np.ndarray]:
+    """
+    Vectorized identify_patterns for replay/backtests.
+    Takes open/high/low/close/volume arrays and returns the same flags as
+    identify_patterns(candles[:i + 1]) for every index i at once.
+    Index 0 has no previous candle: every flag is False / "NEUTRAL" there.
+    Uses the Numba kernel when numba is installed, NumPy otherwise.
+
+    dtype=np.float32 halves the price bandwidth for long backtests; flags can then differ
+    from the float64 scalar path on exact ties. Volume and window sums always stay float64.
+    parallel=False runs the Numba kernel on the calling thread only (see
+    TrendAnalyzer.process_symbols_batch, which spreads symbols over threads instead).
+    """
+    (strong_bull, strong_bear, hammer, shooting_star,
+     bull_engulf, bear_engulf, inside_bar, range_compression, volume_support) = _batch_flags(o, h, l, c, v, dtype, parallel)
+
+    strong_candle = np.select([strong_bull, strong_bear], ["STRONG_BULL", "STRONG_BEAR"], default="NEUTRAL")
+
+    return {
+        "strong_candle": strong_candle,
+        "is_hammer": hammer,
+        "is_shooting_star": shooting_star,
+        "is_bullish_engulfing": bull_engulf,
+        "is_bearish_engulfing": bear_engulf,
+        "is_inside_bar": inside_bar,
+        "is_range_compression": range_compression,
+        "has_volume_support": volume_support
+    }
+
+# --- Packed pattern flags (one uint16 per candle) ---
+# Test with `mask[i] & HAMMER`; bit order matches the batch kernels' output tuple.
+STRONG_BULL = 1 << 0
+STRONG_BEAR = 1 << 1
+HAMMER = 1 << 2
+SHOOTING_STAR = 1 << 3
+BULLISH_ENGULFING = 1 << 4
+BEARISH_ENGULFING = 1 << 5
+INSIDE_BAR = 1 << 6
+RANGE_COMPRESSION = 1 << 7
+VOLUME_SUPPORT = 1 << 8
+
+PATTERN_BITS = (STRONG_BULL, STRONG_BEAR, HAMMER, SHOOTING_STAR, BULLISH_ENGULFING,
+                BEARISH_ENGULFING, INSIDE_BAR, RANGE_COMPRESSION, VOLUME_SUPPORT)
+
+def identify_patterns_mask(o, h, l, c, v, dtype=np.float64) -> np.ndarray:
+    """identify_patterns_batch packed into one np.uint16 bitmask per candle"""
+    mask = np.zeros(len(c), dtype=np.uint16)
+    for bit, flags in zip(PATTERN_BITS, _batch_flags(o, h, l, c, v, dtype)):
+        mask |= flags.astype(np.uint16) * np.uint16(bit)
+    return mask
+
+def unpack_pattern_mask(mask: int) -> Dict[str, Any]:
+    """Expand one candle's bitmask back into the identify_patterns dict"""
+    mask = int(mask)
+    if mask & STRONG_BULL:
+        strong = "STRONG_BULL"
+    elif mask & STRONG_BEAR:
+        strong = "STRONG_BEAR"
+    else:
+        strong = "NEUTRAL"
+
+    return {
+        "strong_candle": strong,
+        "is_hammer": bool(mask & HAMMER),
+        "is_shooting_star": bool(mask & SHOOTING_STAR),
+        "is_bullish_engulfing": bool(mask & BULLISH_ENGULFING),
+        "is_bearish_engulfing": bool(mask & BEARISH_ENGULFING),
+        "is_inside_bar": bool(mask & INSIDE_BAR),
+        "is_range_compression": bool(mask & RANGE_COMPRESSION),
+        "has_volume_support": bool(mask & VOLUME_SUPPORT)
+    }
@@ -1,10 +1,11 @@
 import asyncio
 import os
-import json
 import redis.asyncio as redis
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
+from typing import List
 from dotenv import load_dotenv
+from app.services.redis_manager import _dumps # orjson when installed, else json
 
 # ---------------------------------------------------------
 # 🛠️ SETUP INSTRUCTIONS
@@ -20,19 +21,38 @@ app = FastAPI(title="TradeCore Bridge", description="HTTP to Redis Bridge for Po
 # Redis Config
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
 
+@app.on_event("startup")
+async def startup():
+    # One pooled client for the process instead of a connect + close per request
+    app.state.redis = redis.from_url(REDIS_URL, decode_responses=True)
+
+@app.on_event("shutdown")
+async def shutdown():
+    await app.state.redis.close()
+
 class StartTradingRequest(BaseModel):
     user_id: str
     access_token: str
     capital: float = 100000
     trade_mode: str = "VIRTUAL"
 
+class StopRequest(BaseModel):
+    user_id: str
+
+def _stop_command(user_id: str) -> dict:
+    return {
+        "action": "STOP_TRADING",
+        "user_id": user_id,
+        "data": {}
+    }
+
 @app.post("/start-trading")
 async def start_trading(data: StartTradingRequest):
     """
     Simulates the START_TRADING command from Node.js
     """
     try:
-        r = redis.from_url(REDIS_URL, decode_responses=True)
+        r = app.state.redis
         
         command = {
             "action": "START_TRADING",
@@ -46,8 +66,7 @@ async def start_trading(data: StartTradingRequest):
             }
         }
         
-        await r.publish("trading:commands", json.dumps(command))
-        await r.close()
+        await r.publish("trading:commands", _dumps(command))
         
         return {
             "status": "success", 
@@ -59,23 +78,36 @@ async def start_trading(data: StartTradingRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/stop-trading")
-async def stop_trading(user_id: str):
+async def stop_trading(data: StopRequest):
     """
     Simulates the STOP_TRADING command
     """
     try:
-        r = redis.from_url(REDIS_URL, decode_responses=True)
+        r = app.state.redis
         
-        command = {
-            "action": "STOP_TRADING",
-            "user_id": user_id,
-            "data": {}
-        }
+        command = _stop_command(data.user_id)
+        
+        await r.publish("trading:commands", _dumps(command))
+        
+        return {"status": "success", "message": f"Stop command sent for {data.user_id}"}
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/stop-trading-bulk")
+async def stop_trading_bulk(data: List[StopRequest]):
+    """
+    STOP_TRADING for many users, published in one pipelined round trip
+    """
+    try:
+        r = app.state.redis
         
-        await r.publish("trading:commands", json.dumps(command))
-        await r.close()
+        async with r.pipeline(transaction=False) as pipe:
+            for d in data:
+                pipe.publish("trading:commands", _dumps(_stop_command(d.user_id)))
+            await pipe.execute()
         
-        return {"status": "success", "message": f"Stop command sent for {user_id}"}
+        return {"status": "success", "message": f"Stop command sent for {len(data)} users"}
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
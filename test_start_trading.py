@@ -1,8 +1,8 @@
 import asyncio
-import json
 import redis.asyncio as redis
 from dotenv import load_dotenv
 import os
+from app.services.redis_manager import _dumps # orjson when installed, else json
 
 load_dotenv()
 
@@ -31,7 +31,7 @@ async def send_start_command():
     }
     
     print(f"📤 Sending command to {redis_url}...")
-    await r.publish("trading:commands", json.dumps(command))
+    await r.publish("trading:commands", _dumps(command))
     print("✅ Command sent! Check your main app terminal.")
     
     await r.close()
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Make the project root importable once per pytest session
+sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -1,5 +1,5 @@
 import asyncio
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from app.services.market_data_service import MarketDataService
 
 async def test_key_handling():
@@ -37,18 +37,13 @@ async def test_key_handling():
     for case in test_cases:
         print(f"\nTesting: {case['name']}")
         
-        # Mock httpx client
-        with patch('httpx.AsyncClient') as mock_client_cls:
-            mock_client = MagicMock()
+        # Mock the service's shared httpx client
+        with patch.object(service, '_client') as mock_client:
             mock_response = MagicMock()
             mock_response.status_code = 200
             mock_response.json.return_value = case['response']
             
-            # Setup async context manager mock
-            mock_client.get.return_value = mock_response
-            mock_client.__aenter__.return_value = mock_client
-            mock_client.__aexit__.return_value = None
-            mock_client_cls.return_value = mock_client
+            mock_client.get = AsyncMock(return_value=mock_response)
             
             # Run
             result = await service.get_market_status(case['key'])
@@ -59,5 +54,7 @@ async def test_key_handling():
             else:
                 print(f"❌ FAILED | Expected {case['expected']}, Got {result}")
 
+    await service.close()
+
 if __name__ == "__main__":
     asyncio.run(test_key_handling())
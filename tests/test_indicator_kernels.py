@@ -0,0 +1,67 @@
+"""
+Guards the Numba indicator kernels that replace pandas_ta in TrendAnalyzer.
+Golden values always run; the pandas_ta parity check runs when pandas_ta is installed.
+Run with: python -m pytest tests/test_indicator_kernels.py
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from app.services import _indicator_kernels as kernels
+
+# 32 one-minute bars (bar 3 has zero range, which takes pandas_ta's epsilon path in true range)
+HIGH = np.array([45003.4, 45019.8, 45035.9, 45031.4, 45028.6, 45021.8, 45025.4, 45022.4, 45033.0, 45010.0, 45035.0, 45028.9, 45036.2, 45035.9, 45028.9, 45035.6, 45047.6, 45044.9, 45051.3, 45053.7, 45042.4, 45022.5, 45032.2, 45015.7, 44996.4, 44987.9, 44978.0, 44968.2, 44947.8, 44952.2, 44958.6, 44956.0])
+LOW = np.array([44992.8, 45013.0, 45030.8, 45031.4, 45021.1, 45013.6, 45017.9, 45013.1, 45027.5, 45008.3, 45025.8, 45017.6, 45026.2, 45026.9, 45016.6, 45032.1, 45043.2, 45033.1, 45036.7, 45046.8, 45034.9, 45018.5, 45021.1, 45006.6, 44992.2, 44982.2, 44964.2, 44960.2, 44942.0, 44942.7, 44952.0, 44952.6])
+CLOSE = np.array([45000.4, 45016.7, 45031.4, 45031.4, 45021.7, 45015.4, 45022.2, 45021.6, 45030.5, 45008.4, 45027.2, 45026.0, 45034.2, 45032.5, 45028.0, 45033.5, 45043.4, 45041.0, 45039.2, 45047.4, 45036.9, 45018.8, 45023.5, 45015.5, 44992.4, 44982.7, 44977.0, 44962.7, 44944.8, 44945.3, 44956.0, 44953.2])
+
+# Expected values on the bars above, from the pandas_ta 0.3.14b (non TA-Lib path) formulas
+# evaluated with pandas ewm: (leading NaNs, values after them)
+GOLDEN = {
+    "ema_9": (8, [45021.25555555556, 45018.68444444445, 45020.387555555564, 45021.510044444454, 45024.04803555556, 45025.73842844445, 45026.190742755556, 45027.65259420445, 45030.802075363565, 45032.841660290855, 45034.11332823269, 45036.77066258616, 45036.796530068925, 45033.19722405514, 45031.257779244115, 45028.10622339529, 45020.964978716234, 45013.31198297299, 45006.049586378394, 44997.37966910272, 44986.863735282175, 44978.55098822575, 44974.040790580606, 44969.87263246449]),
+    "rsi_14": (14, [58.36649608392088, 61.479895082530014, 66.35681976954184, 64.23366326404354, 62.61549307304935, 66.72766123066143, 57.93921771153245, 46.55619714768305, 49.33948704124458, 45.03982251129511, 35.43691883996989, 32.32067939196876, 30.61686087980354, 26.79986783325349, 22.943928704606538, 23.27599929512227, 30.20755069790121, 29.45756161897583]),
+    "atr_14": (14, [13.2735562125983, 12.66957781567581, 12.816700229860654, 12.715316013297802, 12.898084039712364, 13.049560763861823, 12.998769316582788, 13.487697073652761, 13.479907328297033, 13.778504415894984, 14.59680195147207, 14.224337246878752, 14.581791483180753, 14.765007912194053, 15.249803736892824, 14.784902807238577, 14.66596204703207, 13.771316029381746]),
+    "adx_14": (27, [20.712094078189608, 23.764230583245002, 25.882724769627007, 27.00538122365341, 27.988281076056534]),
+}
+
+COMPUTE = {
+    "ema_9": lambda h, l, c: kernels.ema(c, 9),
+    "rsi_14": lambda h, l, c: kernels.rsi(c, 14),
+    "atr_14": lambda h, l, c: kernels.atr(h, l, c, 14),
+    "adx_14": lambda h, l, c: kernels.adx(h, l, c, 14),
+}
+
+def make_candles(n=300, seed=7):
+    """Random-walk 1-min OHLC around Bank Nifty levels (a few flat bars to hit the zero-range path)"""
+    rng = np.random.default_rng(seed)
+    close = 45000 + np.cumsum(rng.normal(0, 10, n)).round(2)
+    open_p = (close + rng.normal(0, 5, n)).round(2)
+    high = np.maximum(open_p, close) + rng.random(n).round(2)
+    low = np.minimum(open_p, close) - rng.random(n).round(2)
+    high[:3] = low[:3] = open_p[:3] = close[:3]
+    return pd.DataFrame({"open": open_p, "high": high, "low": low, "close": close})
+
+def assert_close(ours, theirs):
+    theirs = np.asarray(theirs, dtype=np.float64)
+    assert np.array_equal(np.isnan(ours), np.isnan(theirs))
+    assert np.allclose(ours, theirs, rtol=1e-12, atol=0, equal_nan=True)
+
+@pytest.mark.parametrize("name", sorted(GOLDEN))
+def test_golden_values(name):
+    n_nan, values = GOLDEN[name]
+    expected = np.concatenate([np.full(n_nan, np.nan), values])
+    assert_close(COMPUTE[name](HIGH, LOW, CLOSE), expected)
+
+def test_pandas_ta_parity():
+    pytest.importorskip("pandas_ta")
+    df = make_candles()
+    h, l, c = df["high"].to_numpy(), df["low"].to_numpy(), df["close"].to_numpy()
+
+    assert_close(kernels.ema(c, 9), df.ta.ema(length=9))
+    assert_close(kernels.ema(c, 21), df.ta.ema(length=21))
+    assert_close(kernels.rsi(c, 14), df.ta.rsi(length=14))
+    assert_close(kernels.atr(h, l, c, 14), df.ta.atr(length=14))
+    assert_close(kernels.adx(h, l, c, 14), df.ta.adx(length=14)["ADX_14"])
+
+def test_short_history():
+    c = make_candles(n=10)["close"].to_numpy()
+    out = kernels.ema(c, 21)
+    assert len(out) == 10 and np.isnan(out).all()
@@ -0,0 +1,76 @@
+"""
+identify_patterns_batch / identify_patterns_mask must give, at every index i, what the
+scalar identify_patterns gives on candles[:i + 1]. Run with: python -m pytest tests/test_patterns_batch.py
+"""
+from unittest.mock import patch
+import numpy as np
+import pytest
+from app.utils import patterns
+from app.utils.patterns import identify_patterns, identify_patterns_batch, identify_patterns_mask, unpack_pattern_mask
+
+# What identify_patterns_batch reports at index 0, where identify_patterns returns {}
+NO_PREVIOUS = {
+    "strong_candle": "NEUTRAL",
+    "is_hammer": False,
+    "is_shooting_star": False,
+    "is_bullish_engulfing": False,
+    "is_bearish_engulfing": False,
+    "is_inside_bar": False,
+    "is_range_compression": False,
+    "has_volume_support": False,
+}
+
+def make_ohlcv(n=400, seed=11):
+    """Random 1-min bars on a 0.5 tick grid (ties and flat bars included), as an (n, 5) array"""
+    rng = np.random.default_rng(seed)
+    close = 45000 + np.cumsum(rng.normal(0, 8, n))
+    open_p = close + rng.normal(0, 6, n)
+    high = np.maximum(open_p, close) + rng.exponential(3, n) * (rng.random(n) < 0.7)
+    low = np.minimum(open_p, close) - rng.exponential(3, n) * (rng.random(n) < 0.7)
+    ohlcv = np.column_stack([open_p, high, low, close]).round(0) + 0.5 * (rng.random((n, 1)) < 0.5)
+    flat = rng.random(n) < 0.03
+    ohlcv[flat] = ohlcv[flat, 3:4]
+    vol = rng.integers(100, 3000, n).astype(np.float64)
+    vol[rng.random(n) < 0.05] *= 4
+    return np.column_stack([ohlcv, vol])
+
+def scalar_expected(ohlcv):
+    candles = [dict(zip(("open", "high", "low", "close", "volume"), row)) for row in ohlcv.tolist()]
+    return [NO_PREVIOUS] + [identify_patterns(candles[:i + 1]) for i in range(1, len(candles))]
+
+OHLCV = make_ohlcv()
+EXPECTED = scalar_expected(OHLCV)
+
+def assert_matches_scalar(flags):
+    for name in NO_PREVIOUS:
+        got = flags[name].tolist()
+        want = [e[name] for e in EXPECTED]
+        bad = [i for i, (g, w) in enumerate(zip(got, want)) if g != w]
+        assert not bad, f"{name} differs at {bad[:5]}"
+
+def test_data_exercises_every_pattern():
+    for name, idle in NO_PREVIOUS.items():
+        assert any(e[name] != idle for e in EXPECTED), name
+
+def test_numpy_kernel_matches_scalar():
+    with patch.object(patterns, "HAS_NUMBA", False):
+        assert_matches_scalar(identify_patterns_batch(*OHLCV.T))
+
+# Numba kernels as identify_patterns_batch selects them (parallel=True / False), each run both
+# as plain Python (.py_func) and compiled; without numba the compiled entries are the same functions
+NUMBA_KERNELS = [
+    ("parallel-python", "_patterns_nb", patterns._patterns_nb.py_func, True),
+    ("parallel-njit", "_patterns_nb", patterns._patterns_nb, True),
+    ("serial-python", "_patterns_nb_serial", patterns._patterns_nb_serial.py_func, False),
+    ("serial-njit", "_patterns_nb_serial", patterns._patterns_nb_serial, False),
+]
+
+@pytest.mark.parametrize("attr, kernel, parallel", [k[1:] for k in NUMBA_KERNELS], ids=[k[0] for k in NUMBA_KERNELS])
+def test_numba_kernel_matches_scalar(attr, kernel, parallel):
+    with patch.object(patterns, "HAS_NUMBA", True), patch.object(patterns, attr, kernel):
+        assert_matches_scalar(identify_patterns_batch(*OHLCV.T, parallel=parallel))
+
+def test_mask_round_trip():
+    mask = identify_patterns_mask(*OHLCV.T)
+    assert mask.dtype == np.uint16
+    assert [unpack_pattern_mask(m) for m in mask] == EXPECTED
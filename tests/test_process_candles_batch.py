@@ -0,0 +1,95 @@
+"""
+process_candles_batch must leave a TrendAnalyzer in the same state as feeding the
+same candles through process_tick one at a time; process_symbols_batch must match
+per-symbol identify_patterns_batch. Run with: python -m pytest tests/test_process_candles_batch.py
+"""
+from datetime import datetime
+import numpy as np
+import pytest
+
+pytest.importorskip("pandas_ta")
+
+from app.services.trend_analyzer import TrendAnalyzer
+from app.utils.patterns import identify_patterns_batch
+
+SYMBOL = "NSE_INDEX|Nifty Bank"
+
+def make_rows(n, start, seed=3):
+    """(n, 6) open/high/low/close/volume/ts_ms random walk, one row per minute from `start`"""
+    rng = np.random.default_rng(seed)
+    close = 45000 + np.cumsum(rng.normal(0, 10, n))
+    open_p = close + rng.normal(0, 5, n)
+    high = np.maximum(open_p, close) + rng.random(n)
+    low = np.minimum(open_p, close) - rng.random(n)
+    vol = rng.integers(100, 2000, n).astype(np.float64)
+    ts = int(start.timestamp() * 1000) + np.arange(n) * 60_000
+    return np.column_stack([open_p, high, low, close, vol, ts])
+
+def to_candle(row):
+    o, h, l, c, v, ts = row
+    return {'timestamp': datetime.fromtimestamp(ts / 1000), 'open': o, 'high': h, 'low': l, 'close': c, 'volume': v}
+
+def assert_same_state(seq, batch):
+    s, b = seq._get_state(SYMBOL), batch._get_state(SYMBOL)
+    assert s.candles == b.candles
+    assert list(s.vol_window) == list(b.vol_window)
+    assert list(s.range_window) == list(b.range_window)
+    assert s.vol_sum == pytest.approx(b.vol_sum, rel=1e-12)
+    assert s.range_sum == pytest.approx(b.range_sum, rel=1e-12)
+    assert s.last_rolled == b.last_rolled
+    assert seq.get_vwap(SYMBOL) == pytest.approx(batch.get_vwap(SYMBOL), rel=1e-12)
+    assert seq.get_avg_volume(SYMBOL) == batch.get_avg_volume(SYMBOL)
+
+@pytest.mark.parametrize("n, start", [
+    (30, datetime(2024, 1, 1, 10, 0)),  # Too short to analyze
+    (60, datetime(2024, 1, 1, 10, 0)),  # Analyzed, inside the session window
+    (60, datetime(2024, 1, 1, 8, 0)),   # Analyzed, before the session opens
+])
+def test_batch_matches_ticks(n, start):
+    rows = make_rows(n, start)
+    seq, batch = TrendAnalyzer("seq"), TrendAnalyzer("batch")
+    for row in rows.tolist():
+        seq.process_tick(SYMBOL, to_candle(row), is_index=True)
+    batch.process_candles_batch(SYMBOL, rows, is_index=True)
+
+    assert batch.get_vwap(SYMBOL) > 0
+    assert_same_state(seq, batch)
+
+def test_intra_minute_updates_and_new_day():
+    day1 = make_rows(40, datetime(2024, 1, 1, 14, 30), seed=1)
+    day2 = make_rows(30, datetime(2024, 1, 2, 9, 15), seed=2)
+    rows = np.vstack([day1, day2])
+    seq, batch = TrendAnalyzer("seq"), TrendAnalyzer("batch")
+
+    # Ticks revise each minute a few times before it closes; only the final version counts
+    for row in rows.tolist():
+        for bump in (-3.0, 2.0, 0.0):
+            tick = to_candle(row)
+            tick['close'] += bump
+            tick['volume'] -= 50 * abs(bump)
+            seq.process_tick(SYMBOL, tick, is_index=True)
+    batch.process_candles_batch(SYMBOL, rows[:50], is_index=True)
+    # A later batch may start with the minute that is still forming
+    batch.process_candles_batch(SYMBOL, rows[49:], is_index=True)
+
+    assert_same_state(seq, batch)
+    # VWAP restarted with day 2
+    d2 = day2[:, :5]
+    expected = ((d2[:, 1] + d2[:, 2] + d2[:, 3]) / 3) @ d2[:, 4] / d2[:, 4].sum()
+    assert batch.get_vwap(SYMBOL) == pytest.approx(expected, rel=1e-12)
+
+def test_process_symbols_batch():
+    with_ts = make_rows(300, datetime(2024, 1, 1, 9, 15), seed=4)       # (n, 6), process_candles_batch layout
+    without_ts = make_rows(200, datetime(2024, 1, 1, 9, 15), seed=5)[:, :5]  # (n, 5)
+    result = TrendAnalyzer("batch").process_symbols_batch({"A": with_ts, "B": without_ts})
+
+    assert set(result) == {"A", "B"}
+    for symbol, ohlcv in (("A", with_ts), ("B", without_ts)):
+        expected = identify_patterns_batch(*ohlcv[:, :5].T)
+        assert set(result[symbol]) == set(expected)
+        for name, flags in expected.items():
+            assert np.array_equal(result[symbol][name], flags), (symbol, name)
+
+def test_process_symbols_batch_rejects_other_layouts():
+    with pytest.raises(ValueError, match="X"):
+        TrendAnalyzer("batch").process_symbols_batch({"X": np.zeros((10, 4))})
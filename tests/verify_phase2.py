@@ -1,7 +1,6 @@
 import asyncio
 from app.services.trading_manager import UserTrader
 from app.models.trade import TradeType
-from datetime import datetime
 
 # Mock Config
 config = {
@@ -52,6 +51,9 @@ async def verify_execution_engine():
     symbol = trader.active_trade.trade.symbol
     print(f"     Targeting Symbol: {symbol}")
     
+    # Fixed candle time keeps the run independent of the wall clock
+    ts_ms = 1_700_000_000_000
+    
     msg = {
         "feeds": {
             symbol: {
@@ -61,7 +63,7 @@ async def verify_execution_engine():
                         "ohlc": [
                             {
                                 "interval": "I1", 
-                                "ts": int(datetime.now().timestamp() * 1000),
+                                "ts": ts_ms,
                                 "open": 44960, "high": 44960, 
                                 "low": 44940, "close": 44940, "volume": 100
                             }
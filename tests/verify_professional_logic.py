@@ -2,7 +2,6 @@
 import sys
 import os
 import pandas as pd
-import pandas_ta as ta
 from datetime import datetime, time, timedelta
 
 # Add project root to path
@@ -1,22 +1,42 @@
 import asyncio
-import pandas as pd
+import sys
+import os
+import numpy as np
 from datetime import datetime, timedelta
-from app.services.trend_analyzer import TrendAnalyzer, MarketState
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.trend_analyzer import TrendAnalyzer
+from app.utils._njit import njit
+
+VERBOSE = os.getenv("VERBOSE", "").lower() in ("1", "true", "yes")
+EPOCH = datetime(1970, 1, 1)
+
+# Fixed session (10:00 AM on a fixed day) so runs are reproducible
+SESSION_10AM = datetime(2024, 1, 1, 10, 0)
+
+TREND_FLAT, TREND_UP, TREND_DOWN = 0, 1, 2
+TREND_CODES = {"FLAT": TREND_FLAT, "UP": TREND_UP, "DOWN": TREND_DOWN}
+
+# Per-trend tables indexed by trend code (FLAT, UP, DOWN): close move, then wick
+# above max(open, close) / below min(open, close)
+CLOSE_DELTA = np.array([0.0, 10.0, -10.0])
+HIGH_WICK = np.array([2.0, 5.0, 2.0])
+LOW_WICK = np.array([2.0, 2.0, 5.0])
+
+@njit(cache=True)
+def _mock_ohlc(close, trend_code):
+    """(open, high, low, close) of a mock candle opening at `close` (branch-free table lookup)"""
+    open_p = close
+    close = close + CLOSE_DELTA[trend_code]
+    high = max(open_p, close) + HIGH_WICK[trend_code]
+    low = min(open_p, close) - LOW_WICK[trend_code]
+    return open_p, high, low, close
 
 def create_mock_candle(timestamp, close, trend="FLAT"):
     """Helper to create a candle"""
-    open_p = close
-    if trend == "UP":
-        close = close + 10
-        high = close + 5
-        low = open_p - 2
-    elif trend == "DOWN":
-        close = close - 10
-        high = open_p + 2
-        low = close - 5
-    else:
-        high = close + 2
-        low = close - 2
+    open_p, high, low, close = _mock_ohlc(float(close), TREND_CODES.get(trend, TREND_FLAT))
         
     return {
         "timestamp": timestamp,
@@ -27,6 +47,24 @@ def create_mock_candle(timestamp, close, trend="FLAT"):
         "volume": 1000
     }
 
+def expected_5min_count(candles):
+    """Number of 5-min buckets spanned by a gap-free run of 1-min candles (no pandas)"""
+    first_s = int((candles[0]['timestamp'] - EPOCH).total_seconds())
+    last_s = int((candles[-1]['timestamp'] - EPOCH).total_seconds())
+    return last_s // 300 - first_s // 300 + 1
+
+def warm_up_uptrend(analyzer, symbol, base_time, n_up=120):
+    """
+    Feed n_up minutes of uptrend (+10 per candle) in one process_candles_batch call
+    (same analyzer state as n_up process_tick calls, one indicator pass). Returns last close.
+    """
+    close = 45000 + np.cumsum(np.full(n_up, 10.0))
+    open_p = close - 10
+    ts_ms = int(base_time.timestamp() * 1000) + np.arange(n_up) * 60_000
+    ohlcv = np.column_stack([open_p, close + 5, open_p - 2, close, np.full(n_up, 1000.0), ts_ms])
+    analyzer.process_candles_batch(symbol, ohlcv, is_index=True)
+    return float(close[-1])
+
 async def verify_strategy_v2():
     print("[TEST] Verifying Strategy V2 (OI & Multi-Timeframe)...")
     
@@ -60,16 +98,8 @@ async def verify_strategy_v2():
     
     # Generate 120 minutes of UPTREND (to set 5-min EMA Bullish and satisfy min_history)
     # Use fixed time inside trading hours (10:00 AM)
-    today_10am = datetime.now().replace(hour=10, minute=0, second=0, microsecond=0)
-    base_time = today_10am - timedelta(minutes=140)
-    price = 45000
-    
-    # 120 mins of uptrend
-    for i in range(120):
-        c_time = base_time + timedelta(minutes=i)
-        c = create_mock_candle(c_time, price, trend="UP")
-        price = c['close']
-        analyzer.process_tick(symbol, c, is_index=True)
+    base_time = SESSION_10AM - timedelta(minutes=140)
+    price = warm_up_uptrend(analyzer, symbol, base_time)
         
     # Now simulate a short pullback (Down)
     for i in range(3):
@@ -111,8 +141,11 @@ async def verify_strategy_v2():
     print(f"      Confidence Score: {result.get('confidence', 0)}")
     print(f"      Reason: {result.get('reason', 'N/A')}")
     
-    df_5m = analyzer.resample_to_5min(state.candles)
-    print(f"      5-min Candles Generated: {len(df_5m)}")
+    n_5m = expected_5min_count(state.candles)
+    print(f"      5-min Candles Generated: {n_5m}")
+    if VERBOSE:
+        df_5m = analyzer.resample_to_5min(state.candles)
+        print(f"      (resample_to_5min: {len(df_5m)})")
     
     if result.get('signal') == "BUY_CALL" and result.get('confidence', 0) >= 5:
          print("[PASS] Confluence Signal Generated Successfully")
@@ -1,66 +1,99 @@
 
+import asyncio
 import sys
 import os
 from datetime import datetime
+import numpy as np
 
 # Add project root to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from app.services.trade_lifecycle_manager import ActiveTradeContext, DailyRiskMonitor
+from unittest.mock import patch
+from app.services import trade_lifecycle_manager as tlm
+from app.services.redis_manager import redis_manager
+from app.services.risk_engine import RiskEngine
+from app.services.trade_lifecycle_manager import ActiveTradeContext
 from app.models.trade import VirtualTrade, TradeType
 
-def test_daily_risk():
-    print("\n--- Testing Daily Risk Monitor ---")
-    risk = DailyRiskMonitor(max_trades=2, max_loss_amt=100)
+class _MemoryRedis:
+    """Just the string commands RiskEngine uses, kept in a dict (no Redis server needed)"""
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value):
+        self.data[key] = str(value)
+
+    async def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1)
+        return int(self.data[key])
+
+    async def incrbyfloat(self, key, amount):
+        self.data[key] = str(float(self.data.get(key, 0.0)) + amount)
+        return float(self.data[key])
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+async def _run_daily_risk():
+    risk = RiskEngine("test_user", max_trades=2, max_loss_amt=100)
     
     # 1. Check Initial
-    ok, msg = risk.can_trade()
+    ok, msg = await risk.can_trade()
     print(f"Initial Check: {ok} ({msg})")
     assert ok == True
     
     # 2. Record Loss
-    risk.record_trade(-50)
+    await risk.record_trade(-50)
     print("Recorded Loss -50")
-    ok, msg = risk.can_trade()
+    ok, msg = await risk.can_trade()
     assert ok == True
     
     # 3. Record Another Loss (Total -150 > -100)
-    risk.record_trade(-100)
+    await risk.record_trade(-100)
     print("Recorded Loss -100 (Total -150)")
-    ok, msg = risk.can_trade()
+    ok, msg = await risk.can_trade()
     print(f"Check after Breach: {ok} ({msg})")
     assert ok == False
     assert ("Loss Reached" in msg) or ("Locked" in msg)
 
-def test_trade_lifecycle_call():
-    print("\n--- Testing Trade Lifecycle (CALL) ---")
+def test_daily_risk():
+    print("\n--- Testing Daily Risk (RiskEngine) ---")
+    with patch.object(redis_manager, "redis", _MemoryRedis()):
+        asyncio.run(_run_daily_risk())
+
+def _run_call_lifecycle():
     # Entry: 100, ATR: 10, SL: 90
     trade = VirtualTrade(symbol="TEST", tradeType=TradeType.CALL, entryPrice=100, quantity=100)
     ctx = ActiveTradeContext(trade, atr=10.0, sl=90.0, target=120.0)
     
-    # 1. Price moves to 105 (+0.5 ATR) -> No Action
-    actions = ctx.update(current_price=105, high=105, low=102)
-    print(f"Price 105: {actions}")
-    assert not actions
-    
-    # 2. Price moves to 110 (+1.0 ATR) -> Break Even
-    actions = ctx.update(current_price=110, high=110, low=108)
-    print(f"Price 110: {actions}")
-    assert "update_sl" in actions
-    assert actions["update_sl"] == 100.0 # BE
+    # Rows of (price, high, low); expected SL update per step (NaN = none)
+    # 105 (+0.5 ATR) -> No Action
+    # 110 (+1.0 ATR) -> Break Even (SL 100)
+    # 112 (+1.2 ATR) -> Partial Exit
+    # 115 (+1.5 ATR), Candle Low 113 -> Trailing moves SL from 100 to 113
+    inputs = np.array([[105, 105, 102], [110, 110, 108], [112, 112, 111], [115, 115, 113]], dtype=np.float64)
+    expected = np.array([np.nan, 100.0, np.nan, 113.0])
     
-    # 3. Price moves to 112 (+1.2 ATR) -> Partial Exit
-    actions = ctx.update(current_price=112, high=112, low=111)
-    print(f"Price 112: {actions}")
-    assert "partial_exit" in actions
+    steps = [ctx.update(current_price=p, high=h, low=l) for p, h, l in inputs.tolist()]
+    for (p, _, l), actions in zip(inputs.tolist(), steps):
+        print(f"Price {p:g} (Low {l:g}): {actions}")
     
-    # 4. Price moves to 115 (+1.5 ATR) -> Trailing Active
-    # Need to pass Candle Low. Say Candle Low was 113.
-    # Current SL is 100 (BE). Should move to 113.
-    actions = ctx.update(current_price=115, high=115, low=113)
-    print(f"Price 115 (Low 113): {actions}")
-    assert "update_sl" in actions
-    assert actions["update_sl"] == 113
+    actual = np.fromiter((a.get("update_sl", np.nan) for a in steps), dtype=np.float64, count=len(steps))
+    assert np.allclose(actual, expected, equal_nan=True), actual
+    assert not steps[0]
+    assert "partial_exit" in steps[2]
+
+def test_trade_lifecycle_call():
+    print("\n--- Testing Trade Lifecycle (CALL) ---")
+    # Same scenario through the plain-Python kernel and the compiled one
+    for name, kernel in (("python", tlm._update_trade_state.py_func), ("njit", tlm._update_trade_state)):
+        print(f"[{name}]")
+        with patch.object(tlm, "_update_trade_state", kernel):
+            _run_call_lifecycle()
 
 if __name__ == "__main__":
     test_daily_risk()
@@ -5,81 +5,83 @@ import os
 # Add app to path
 sys.path.append(os.getcwd())
 
-from app.services.trend_analyzer import analyze_trend, update_market_context, candle_store
-from datetime import datetime, timedelta
+import numpy as np
+from app.services.trend_analyzer import TrendAnalyzer
+from datetime import datetime, time
 
 
 async def test_pipeline():
     print("Starting Pipeline Verification...")
+    analyzer = TrendAnalyzer("verify_pipeline")
     
     # 1. Simulate Market Context (REST API)
     # Scenario: Bullish Context (PCR < 1)
     print("\n1. Simulating Option Chain Update (REST)")
     symbol = "NSE_INDEX|Nifty Bank"
     pcr = 0.6 # Bullish
-    update_market_context(symbol, pcr)
+    analyzer.update_context(symbol, pcr=pcr)
     print(f"Market Context Updated: PCR={pcr}")
 
     # 2. Simulate Ticks to Build History (WebSocket)
     print("\n2. Simulating Tick Data Stream (WebSocket)")
     
-    # We need to generate ~25 fake candles to prime indicators (EMA21)
+    # 50+ candles are needed before the analyzer runs (EMA21/ADX warm-up);
+    # start at 10:00 so the last candle falls inside the morning session window
+    n = 60
     base_price = 45000.0
-    start_time = datetime.now() - timedelta(minutes=30)
-    
-    ticks = []
+    start_time = datetime.combine(datetime.now().date(), time(10, 0))
     
     # Generate Trending Up Scenario
     # Price increasing, Volume increasing
-    for i in range(30):
-        t_time = start_time + timedelta(minutes=i)
-        
-        # Bullish Candle
-        open_p = base_price + (i * 10)
-        close_p = open_p + 15
-        high_p = close_p + 2
-        low_p = open_p - 2
-        volume = 1000 + (i * 100)
-        
-        # Upstox Message Format Mock
-        msg = {
-            "feeds": {
-                symbol: {
-                    "ff": {
-                        "ltpc": {"ltp": close_p},
-                        "marketOHLC": {
-                            "ohlc": [
-                                {
-                                    "interval": "I1", 
-                                    "ts": int(t_time.timestamp() * 1000),
-                                    "open": open_p, "high": high_p, "low": low_p, "close": close_p, "volume": volume
-                                }
-                            ]
-                        }
-                    }
-                }
-            }
-        }
-        await analyze_trend(msg)
-        
-    print(f"History Built: {len(candle_store.get(symbol, []))} candles")
+    # All bullish candles are built as columns and ingested in one batch call
+    i = np.arange(n)
+    open_arr = base_price + i * 10
+    close_arr = open_arr + 15
+    high_arr = close_arr + 2
+    low_arr = open_arr - 2
+    vol_arr = 1000 + i * 100
+    ts_arr = int(start_time.timestamp() * 1000) + i * 60_000
+    
+    ohlcv = np.column_stack([open_arr, high_arr, low_arr, close_arr, vol_arr, ts_arr])
+    signal = analyzer.process_candles_batch(symbol, ohlcv, is_index=True)
     
-    # 3. Trigger Verification
-    # Send one last "Strong Bull" candle on top of current context
-    print("\n3. Verifying Signal Generation")
+    candles = analyzer._get_state(symbol).candles
+    print(f"History Built: {len(candles)} candles")
+    assert len(candles) == n
+    assert candles[-1]['close'] == close_arr[-1]
     
-    # Last Price = 45000 + 290 + 15 = 45305
-    # VWAP should be roughly (Mean Price * Vol) / Vol. 
-    # Since price is strictly increasing, Price > VWAP should hold.
-    # EMA9 should be > EMA21.
-    # Price Action = Strong Bull.
-    # PCR = 0.6 (< 1).
+    # 3. Verify the analyzer state the signal was computed from
+    print("\n3. Verifying Analyzer State")
     
-    # Expected: BUY_CALL
+    # VWAP covers every candle of the session once
+    typical = (high_arr + low_arr + close_arr) / 3
+    expected_vwap = (typical * vol_arr).sum() / vol_arr.sum()
+    vwap = analyzer.get_vwap(symbol)
+    print(f"VWAP: {vwap:.2f} (expected {expected_vwap:.2f})")
+    assert np.isclose(vwap, expected_vwap, rtol=1e-12)
+    # Price is strictly increasing, so Price > VWAP should hold
+    assert close_arr[-1] > vwap
     
-    # Wait a tiny bit for async prints to flush? No need in script.
+    # Volume SMA20 over the candles before the last one
+    avg_vol = analyzer.get_avg_volume(symbol)
+    print(f"Avg Volume (20): {avg_vol}")
+    assert avg_vol == vol_arr[-21:-1].mean()
     
-    print("\nVerification Complete. Check console output for 'EXECUTE BUY_CALL'")
+    # 4. Signal Generation
+    # Uptrend bias (EMA9 > EMA21, Price > VWAP, PCR 0.6); an entry still needs a pattern setup and
+    # enough score, so the result is reported rather than asserted
+    print("\n4. Signal Generation")
+    assert isinstance(signal, dict)
+    print(f"Signal: {signal.get('signal', 'NONE') if signal else 'NONE'} {signal}")
+    
+    print("\nVerification Complete.")
 
 if __name__ == "__main__":
-    asyncio.run(test_pipeline())
+    # uvloop is an optional drop-in replacement for the default selector loop
+    try:
+        import uvloop
+        run = uvloop.run
+    except ImportError:
+        run = asyncio.run
+
+    run(test_pipeline())